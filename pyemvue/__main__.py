@@ -4,6 +4,7 @@ import dateutil
 
 # Our files
 from pyemvue.device import VueDevice, VueUsageDevice
+from pyemvue.device_registry import DeviceRegistry
 from pyemvue.enums import Scale, Unit
 from pyemvue.pyemvue import PyEmVue
 
@@ -44,61 +45,30 @@ def main():
     print("Logged in. Authtoken follows:")
     print(vue.auth.tokens["id_token"])
     print()
-    channelTypes = vue.get_channel_types()
+    registry = DeviceRegistry(channel_types=vue.get_channel_types())
     devices = vue.get_devices()
-    deviceGids: list[int] = []
-    deviceInfo: dict[int, VueDevice] = {}
     for device in devices:
-        if not device.device_gid in deviceGids:
-            deviceGids.append(device.device_gid)
-            deviceInfo[device.device_gid] = device
+        if device.device_gid not in registry:
             print(
                 device.device_gid, device.manufacturer_id, device.model, device.firmware
             )
-            for chan in device.channels:
-                channelTypeInfo = next(
-                    (
-                        c
-                        for c in channelTypes
-                        if c.channel_type_gid == chan.channel_type_gid
-                    ),
-                    None,
-                )
-                print(
-                    "\t",
-                    chan.device_gid,
-                    chan.name,
-                    chan.channel_num,
-                    chan.channel_multiplier,
-                    (
-                        channelTypeInfo.description
-                        if channelTypeInfo
-                        else chan.channel_type_gid
-                    ),
-                )
-        else:
-            deviceInfo[device.device_gid].channels += device.channels
-            for chan in device.channels:
-                channelTypeInfo = next(
-                    (
-                        c
-                        for c in channelTypes
-                        if c.channel_type_gid == chan.channel_type_gid
-                    ),
-                    None,
-                )
-                print(
-                    "\t",
-                    chan.device_gid,
-                    chan.name,
-                    chan.channel_num,
-                    chan.channel_multiplier,
-                    (
-                        channelTypeInfo.description
-                        if channelTypeInfo
-                        else chan.channel_type_gid
-                    ),
-                )
+        registry.add(device)
+        for chan in device.channels:
+            channelTypeInfo = registry.get_channel_type(chan)
+            print(
+                "\t",
+                chan.device_gid,
+                chan.name,
+                chan.channel_num,
+                chan.channel_multiplier,
+                (
+                    channelTypeInfo.description
+                    if channelTypeInfo
+                    else chan.channel_type_gid
+                ),
+            )
+    deviceGids = list(registry.devices)
+    deviceInfo = registry.devices
 
     monthly, start = vue.get_chart_usage(
         devices[0].channels[0], scale=Scale.MONTH.value
@@ -117,16 +87,20 @@ def main():
     use = vue.get_device_list_usage(deviceGids, now, Scale.DAY.value)
     print_recursive(use, deviceInfo)
     print("Total usage for yesterday in kwh: ")
-    for gid, device in deviceInfo.items():
-        for chan in device.channels:
-            usage = vue.get_chart_usage(
-                chan,
-                yesterday,
-                yesterday + datetime.timedelta(hours=23, minutes=59),
-                Scale.DAY.value,
-            )
-            if usage and usage[0]:
-                print(f"{chan.device_gid} ({chan.channel_num}): {usage[0][0]} kwh")
+    channels = [chan for device in deviceInfo.values() for chan in device.channels]
+    usages, errors = vue.get_chart_usage_many(
+        channels,
+        yesterday,
+        yesterday + datetime.timedelta(hours=23, minutes=59),
+        Scale.DAY.value,
+    )
+    for chan in channels:
+        key = (chan.device_gid, chan.channel_num)
+        usage = usages.get(key)
+        if usage and usage[0]:
+            print(f"{chan.device_gid} ({chan.channel_num}): {usage[0][0]} kwh")
+        elif key in errors:
+            print(f"{chan.device_gid} ({chan.channel_num}): failed, {errors[key]}")
     print("Average usage over the last minute in watts: ")
     use = vue.get_device_list_usage(deviceGids, None, Scale.MINUTE.value)
     print_recursive(use, deviceInfo, scaleBy=60000, unit="W")
@@ -143,7 +117,7 @@ def main():
     for usage in usage_over_time:
         print(usage, "kwh")
 
-    (outlets, chargers) = vue.get_devices_status(devices)
+    (outlets, chargers) = vue.get_devices_status(registry)
     print("List of Outlets:")
     for outlet in outlets:
         print(f"\t{outlet.device_gid} On? {outlet.outlet_on}")
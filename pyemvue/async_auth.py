@@ -0,0 +1,221 @@
+import asyncio
+import time
+from typing import Any, Optional, Callable
+
+import aiohttp
+from typing_extensions import Self
+
+from pyemvue.auth import Auth, _record_outcome
+from pyemvue.circuit_breaker import CircuitBreaker
+from pyemvue.json_decoder import loads as json_loads
+from pyemvue.rate_limiter import RateLimiter
+from pyemvue.retry import RetryPolicy, RetryState
+from pyemvue.token_store import TokenStore
+
+
+class AsyncResponse(object):
+    """A fully read aiohttp response exposing the parts of the requests.Response interface used by the library."""
+
+    def __init__(self, response: aiohttp.ClientResponse, content: bytes):
+        self.response = response
+        self.status_code = response.status
+        self.headers = response.headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.response.get_encoding())
+
+    def json(self) -> Any:
+        return json_loads(self.content)
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+
+class AsyncAuth(Auth):
+    """Auth that makes its API requests through a pooled aiohttp session.
+    Token handling is shared with Auth; the blocking Cognito calls are run in a worker thread."""
+
+    def __init__(
+        self,
+        host: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        connect_timeout: float = 6.03,
+        read_timeout: float = 10.03,
+        tokens: Optional["dict[str, Any]"] = None,
+        token_updater: Optional[Callable[["dict[str, Any]"], None]] = None,
+        max_retry_attempts: int = 5,
+        initial_retry_delay: float = 0.5,
+        max_retry_delay: float = 30.0,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        keep_alive: bool = True,
+        keepalive_timeout: float = 15.0,
+        jwks_cache_file: Optional[str] = None,
+        jwks_cache_ttl: float = 86400.0,
+        token_store: Optional[TokenStore] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(
+            host,
+            username=username,
+            password=password,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            tokens=tokens,
+            token_updater=token_updater,
+            max_retry_attempts=max_retry_attempts,
+            initial_retry_delay=initial_retry_delay,
+            max_retry_delay=max_retry_delay,
+            jwks_cache_file=jwks_cache_file,
+            jwks_cache_ttl=jwks_cache_ttl,
+            token_store=token_store,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+        )
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keep_alive = keep_alive
+        self.keepalive_timeout = keepalive_timeout
+        self._client_session: Optional[aiohttp.ClientSession] = None
+
+    async def async_refresh_tokens(self) -> "dict[str, str]":
+        """Refresh and return new tokens without blocking the event loop."""
+        return await asyncio.to_thread(self.refresh_tokens)
+
+    async def async_get_username(self) -> str:
+        """Get the username associated with the logged in user."""
+        return await asyncio.to_thread(self.get_username)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        retry_state: Optional[RetryState] = None,
+        **kwargs,
+    ) -> AsyncResponse:
+        """Make a request. Pass the retry_state of an enclosing operation to keep within its deadline."""
+        if not self.tokens or not self.tokens["access_token"]:
+            raise ValueError("Not authenticated. Incorrect username or password?")
+
+        state = retry_state or self.retry_policy.start()
+        attempts = 0
+        while True:
+            attempts += 1
+            access_token = self.tokens["access_token"]
+            if time.time() > await self._async_access_token_expiry():
+                # expired, get new tokens
+                await asyncio.to_thread(self._refresh_tokens_if_stale, access_token)
+                access_token = self.tokens["access_token"]
+
+            response = await self._guarded_request(method, path, state, **kwargs)
+
+            if response.status_code == 401:
+                # if unauthorized, try refreshing the tokens
+                await asyncio.to_thread(self._refresh_tokens_if_stale, access_token)
+                # then run the request again with updated tokens
+                response = await self._guarded_request(method, path, state, **kwargs)
+
+            delay = self._retry_delay(path, response, attempts, state)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        """Close the aiohttp session and release pooled connections."""
+        super().close()
+        if self._client_session:
+            await self._client_session.close()
+            self._client_session = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def __enter__(self) -> Self:
+        # close() is a coroutine here, the sync protocol inherited from Auth would never await it
+        raise TypeError("Use 'async with' with AsyncAuth")
+
+    def __exit__(self, *args):
+        raise TypeError("Use 'async with' with AsyncAuth")
+
+    async def _async_access_token_expiry(self) -> float:
+        cached = self._access_token_expiry
+        if cached and cached[0] == self.tokens["access_token"]:
+            return cached[1]
+        # decoding may need to download the signing keys
+        return await asyncio.to_thread(self._get_access_token_expiry)
+
+    async def _guarded_request(
+        self, method: str, path: str, retry_state: RetryState, **kwargs
+    ) -> AsyncResponse:
+        """Make the request through the circuit breaker, if there is one."""
+        breaker = self.circuit_breaker
+        if not breaker:
+            return await self._do_request(method, path, retry_state, **kwargs)
+        if not breaker.closed:
+            # checking for maintenance may block on a request
+            await asyncio.to_thread(breaker.before_request)
+        try:
+            response = await self._do_request(method, path, retry_state, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure()
+            raise
+        _record_outcome(breaker, response)
+        return response
+
+    def _get_client_session(self) -> aiohttp.ClientSession:
+        if not self._client_session or self._client_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                force_close=not self.keep_alive,
+                keepalive_timeout=self.keepalive_timeout if self.keep_alive else None,
+            )
+            self._client_session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept-Encoding": "gzip, deflate"},
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.connect_timeout, sock_read=self.read_timeout
+                ),
+            )
+        return self._client_session
+
+    async def _do_request(
+        self,
+        method: str,
+        path: str,
+        retry_state: Optional[RetryState] = None,
+        **kwargs,
+    ) -> AsyncResponse:
+        headers = kwargs.pop("headers", None)
+
+        if headers is None:
+            headers = {}
+        else:
+            headers = dict(headers)
+        headers["authtoken"] = self.tokens["id_token"]
+
+        if self.rate_limiter:
+            wait = self.rate_limiter.reserve(path)
+            if wait > 0:
+                await asyncio.sleep(retry_state.timeout(wait) if retry_state else wait)
+
+        if retry_state and retry_state.remaining() is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(
+                total=retry_state.timeout(self.connect_timeout + self.read_timeout),
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            )
+
+        async with self._get_client_session().request(
+            method, f"{self.host}/{path}", headers=headers, **kwargs
+        ) as response:
+            return AsyncResponse(response, await response.read())
@@ -0,0 +1,417 @@
+import asyncio
+import datetime
+from typing import Any, AsyncIterator, Callable, Optional, Union
+
+from typing_extensions import Self
+
+# Our files
+from pyemvue.async_auth import AsyncAuth
+from pyemvue.customer import Customer
+from pyemvue.device_registry import DeviceRegistry
+from pyemvue.device import (
+    ChargerDevice,
+    DeviceListUsage,
+    OutletDevice,
+    VueDevice,
+    VueDeviceChannel,
+    VueDeviceChannelUsage,
+    VueUsageDevice,
+)
+from pyemvue.enums import Scale, Unit
+from pyemvue.json_decoder import loads as json_loads
+from pyemvue.circuit_breaker import CircuitBreaker
+from pyemvue.poller import PollSchedule, UsageSample, iter_channel_usage
+from pyemvue.rate_limiter import RateLimiter
+from pyemvue.retry import RetryPolicy
+from pyemvue.token_store import TokenStore
+from pyemvue.pyemvue import (
+    API_CHARGER,
+    API_CUSTOMER,
+    API_CUSTOMER_DEVICES,
+    API_GET_STATUS,
+    API_OUTLET,
+    API_ROOT,
+    _batch_device_gids,
+    _chart_usage_url,
+    _get_maintenance_message,
+    _add_incomplete_device_list_usage,
+    _device_list_usage_retry_delay,
+    _device_list_usage_url,
+    _parse_chart_usage,
+    _record_device_list_usage,
+    _parse_devices,
+    _parse_devices_status,
+    _prepare_login,
+    _split_chart_range,
+    _stitch_chart_usage,
+)
+
+
+class AsyncPyEmVue(object):
+    """asyncio version of PyEmVue. Requires the optional aiohttp dependency (pip install pyemvue[async])."""
+
+    def __init__(
+        self,
+        connect_timeout: float = 6.03,
+        read_timeout: float = 10.03,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        keep_alive: bool = True,
+        keepalive_timeout: float = 15.0,
+        jwks_cache_file: Optional[str] = None,
+        jwks_cache_ttl: float = 86400.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        lazy_nested_devices: bool = False,
+    ):
+        """connection_limit caps the total number of pooled connections, 0 for no limit.
+        connection_limit_per_host caps the connections to a single host, 0 for no limit.
+        A RateLimiter can be provided to limit how fast requests are sent.
+        A RetryPolicy replaces the default retry behavior, its deadline bounds each operation including all retries.
+        A CircuitBreaker makes calls fail fast with CircuitOpenError while the API is down. Unless it already has one,
+        it is given a maintenance_checker that checks the maintenance status.
+        With lazy_nested_devices the nested devices in get_device_list_usage are only decoded when they are read."""
+        self.username = None
+        self.token_storage_file = None
+        self.token_store: Optional[TokenStore] = None
+        self.customer = None
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keep_alive = keep_alive
+        self.keepalive_timeout = keepalive_timeout
+        self.jwks_cache_file = jwks_cache_file
+        self.jwks_cache_ttl = jwks_cache_ttl
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.lazy_nested_devices = lazy_nested_devices
+        if circuit_breaker and not circuit_breaker.maintenance_checker:
+            circuit_breaker.maintenance_checker = lambda: _get_maintenance_message(
+                None, (self.connect_timeout, self.read_timeout)
+            )
+
+    async def close(self):
+        """Close the HTTP session and release any pooled connections."""
+        auth: Optional[AsyncAuth] = getattr(self, "auth", None)
+        if auth:
+            await auth.close()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def get_devices(self) -> "list[VueDevice]":
+        """Get all devices under the current customer account."""
+        response = await self.auth.request("get", API_CUSTOMER_DEVICES)
+        response.raise_for_status()
+        if response.content:
+            return _parse_devices(json_loads(response.content))
+        return []
+
+    async def get_customer_details(self) -> Optional[Customer]:
+        """Get details for the current customer."""
+        response = await self.auth.request("get", API_CUSTOMER)
+        response.raise_for_status()
+        if response.content:
+            return Customer().from_json_dictionary(json_loads(response.content))
+        return None
+
+    async def get_device_list_usage(
+        self,
+        deviceGids: Union[str, "list[str]"],
+        instant: Optional[datetime.datetime],
+        scale=Scale.SECOND.value,
+        unit=Unit.KWH.value,
+        max_retry_attempts: int = 5,
+        initial_retry_delay: float = 2.0,
+        max_retry_delay: float = 30.0,
+        max_batch_size: Optional[int] = None,
+    ) -> DeviceListUsage:
+        """Returns a nested dictionary of VueUsageDevice and VueDeviceChannelUsage with the total usage of the devices over the specified scale. Note that you may need to scale this to get a rate (1MIN in kw = 60*result)
+        The max_retry_* arguments are ignored if a retry_policy was given to the constructor.
+        Devices are requested concurrently in batches of at most max_batch_size, and small enough to keep the url
+        within DEVICE_LIST_USAGE_MAX_URL_LENGTH. Each batch is retried on its own.
+        Retries only request the devices that had channels without usage, any still missing are listed in missing_channels of the result.
+        Devices the response leaves out entirely are not retried and are listed in missing_devices."""
+        if not instant:
+            instant = datetime.datetime.now(datetime.timezone.utc)
+        policy = self.retry_policy or RetryPolicy(
+            max_attempts=max_retry_attempts,
+            initial_delay=max(initial_retry_delay, 0.5),
+            max_delay=max_retry_delay,
+            jitter=0,
+        )
+        batches = _batch_device_gids(deviceGids, instant, scale, unit, max_batch_size)
+        devices = DeviceListUsage()
+        for batch_devices in await asyncio.gather(
+            *(
+                self._get_device_list_usage_batch(gids, instant, scale, unit, policy)
+                for gids in batches
+            )
+        ):
+            devices.update(batch_devices)
+            devices.missing_channels.extend(batch_devices.missing_channels)
+            devices.missing_devices.extend(batch_devices.missing_devices)
+        return devices
+
+    async def _get_device_list_usage_batch(
+        self,
+        deviceGids: "list[str]",
+        instant: datetime.datetime,
+        scale: str,
+        unit: str,
+        policy: RetryPolicy,
+    ) -> DeviceListUsage:
+        state = policy.start()
+        # with a client wide retry policy its deadline covers the retries made by auth as well
+        auth_retry_state = state if self.retry_policy else None
+        attempts = 0
+        pending = deviceGids
+        devices = DeviceListUsage()
+        incomplete: dict[int, VueUsageDevice] = {}
+
+        while True:
+            attempts += 1
+            url = _device_list_usage_url(pending, instant, scale, unit)
+            response = await self.auth.request("get", url, retry_state=auth_retry_state)
+            pending = _record_device_list_usage(
+                response, pending, devices, incomplete, self.lazy_nested_devices
+            )
+            delay = _device_list_usage_retry_delay(
+                pending, state, attempts, self.auth.circuit_breaker
+            )
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+        _add_incomplete_device_list_usage(devices, incomplete)
+        if response:
+            response.raise_for_status()
+        return devices
+
+    async def iter_usage(
+        self,
+        device_gids: Union[str, "list[str]"],
+        scale=Scale.MINUTE.value,
+        unit=Unit.KWH.value,
+        offset: float = 0.0,
+        max_retry_attempts: int = 2,
+        on_error: Optional[Callable[[datetime.datetime, Exception], None]] = None,
+    ) -> AsyncIterator[UsageSample]:
+        """Poll the usage of the devices at every boundary of the scale and yield a UsageSample for every channel,
+        see PyEmVue.iter_usage. Polling only continues as the samples are consumed."""
+        schedule = PollSchedule(scale, offset)
+        while True:
+            await asyncio.sleep(schedule.wait_time())
+            instant = schedule.take()
+            try:
+                usage = await self.get_device_list_usage(
+                    device_gids,
+                    instant,
+                    scale,
+                    unit,
+                    max_retry_attempts=max_retry_attempts,
+                )
+            except Exception as ex:
+                if not on_error:
+                    raise
+                on_error(instant, ex)
+                continue
+            for sample in iter_channel_usage(usage, instant):
+                yield sample
+
+    async def get_chart_usage(
+        self,
+        channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        scale=Scale.SECOND.value,
+        unit=Unit.KWH.value,
+    ) -> "tuple[list[float], Optional[datetime.datetime]]":
+        """Gets the usage over a given time period and the start of the measurement period. Note that you may need to scale this to get a rate (1MIN in kw = 60*result)
+        Ranges longer than CHART_USAGE_MAX_WINDOWS allows for the scale are fetched concurrently in chunks and stitched together.
+        Points missing from the stitched series are None."""
+        if channel.channel_num in ["MainsFromGrid", "MainsToGrid"]:
+            # This is not populated for the special Mains data as of right now
+            return [], start
+        if not start:
+            start = datetime.datetime.now(datetime.timezone.utc)
+        if not end:
+            end = datetime.datetime.now(datetime.timezone.utc)
+        windows = _split_chart_range(start, end, scale)
+        if len(windows) > 1:
+            chunks = await asyncio.gather(
+                *[
+                    self._get_chart_usage_window(
+                        channel, window_start, window_end, scale, unit
+                    )
+                    for window_start, window_end in windows
+                ]
+            )
+            return _stitch_chart_usage(chunks, windows, scale)
+        return await self._get_chart_usage_window(channel, start, end, scale, unit)
+
+    async def _get_chart_usage_window(
+        self,
+        channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        scale: str,
+        unit: str,
+    ) -> "tuple[list[float], Optional[datetime.datetime]]":
+        url = _chart_usage_url(channel, start, end, scale, unit)
+        response = await self.auth.request("get", url)
+        response.raise_for_status()
+        if response.content:
+            return _parse_chart_usage(json_loads(response.content), start)
+        return [], start
+
+    async def get_chart_usage_many(
+        self,
+        channels: "list[Union[VueDeviceChannel, VueDeviceChannelUsage]]",
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        scale=Scale.SECOND.value,
+        unit=Unit.KWH.value,
+        max_concurrency: int = 100,
+    ) -> "tuple[dict[tuple[int, str], tuple[list[float], Optional[datetime.datetime]]], dict[tuple[int, str], Exception]]":
+        """Gets the usage of several channels concurrently, see get_chart_usage. Returns a tuple of the results and the errors, both keyed by (device_gid, channel_num)."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        start = start or now
+        end = end or now
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+        async def fetch(channel):
+            async with semaphore:
+                return await self.get_chart_usage(channel, start, end, scale, unit)
+
+        keys = [(channel.device_gid, channel.channel_num) for channel in channels]
+        outcomes = await asyncio.gather(
+            *[fetch(channel) for channel in channels], return_exceptions=True
+        )
+        results: dict[tuple[int, str], tuple[list[float], Optional[datetime.datetime]]] = {}
+        errors: dict[tuple[int, str], Exception] = {}
+        for key, outcome in zip(keys, outcomes):
+            if isinstance(outcome, Exception):
+                errors[key] = outcome
+            else:
+                results[key] = outcome
+        return results, errors
+
+    async def update_outlet(
+        self, outlet: OutletDevice, on: Optional[bool] = None
+    ) -> OutletDevice:
+        """Primarily to turn an outlet on or off. If the on parameter is not provided then uses the value in the outlet object.
+        If on parameter provided uses the provided value."""
+        if on is not None:
+            outlet.outlet_on = on
+
+        response = await self.auth.request(
+            "put", API_OUTLET, json=outlet.as_dictionary()
+        )
+        response.raise_for_status()
+        outlet.from_json_dictionary(json_loads(response.content))
+        return outlet
+
+    async def update_charger(
+        self,
+        charger: ChargerDevice,
+        on: Optional[bool] = None,
+        charge_rate: Optional[int] = None,
+    ) -> ChargerDevice:
+        """Primarily to enable/disable an evse/charger. The on and charge_rate parameters override the values in the object if provided"""
+        if on is not None:
+            charger.charger_on = on
+        if charge_rate:
+            charger.charging_rate = charge_rate
+
+        response = await self.auth.request(
+            "put", API_CHARGER, json=charger.as_dictionary()
+        )
+        response.raise_for_status()
+        charger.from_json_dictionary(json_loads(response.content))
+        return charger
+
+    async def get_devices_status(
+        self, device_list: Optional[Union["list[VueDevice]", DeviceRegistry]] = None
+    ) -> "tuple[list[OutletDevice], list[ChargerDevice]]":
+        """Gets the list of outlets and chargers. If device list is provided, updates the connected status on each device.
+        A DeviceRegistry also has the outlets and chargers of its devices updated."""
+        response = await self.auth.request("get", API_GET_STATUS)
+        response.raise_for_status()
+        if response.content:
+            return _parse_devices_status(json_loads(response.content), device_list)
+        return ([], [])
+
+    async def login(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        id_token: Optional[str] = None,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+        token_storage_file: Optional[str] = None,
+        token_store: Optional[TokenStore] = None,
+    ) -> bool:
+        """Authenticates the current user using access tokens if provided or username/password if no tokens available.
+        Provide a path for storing the token data that can be used to reauthenticate without providing the password.
+        Tokens stored in the file are updated when they expire.
+        Alternatively provide a token_store to control where the tokens are kept. Processes sharing a store
+        pick up each other's refreshed tokens instead of all refreshing them.
+        """
+        password, tokens, jwks_cache_file = _prepare_login(
+            self,
+            username,
+            password,
+            id_token,
+            access_token,
+            refresh_token,
+            token_storage_file,
+            token_store,
+        )
+
+        await self.close()
+        # creating the Cognito client loads botocore data from disk
+        self.auth = await asyncio.to_thread(
+            AsyncAuth,
+            host=API_ROOT,
+            username=self.username,
+            password=password,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tokens=tokens,
+            token_updater=self._store_tokens,
+            token_store=self.token_store,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
+            connection_limit=self.connection_limit,
+            connection_limit_per_host=self.connection_limit_per_host,
+            keep_alive=self.keep_alive,
+            keepalive_timeout=self.keepalive_timeout,
+            jwks_cache_file=jwks_cache_file,
+            jwks_cache_ttl=self.jwks_cache_ttl,
+        )
+
+        try:
+            await self.auth.async_refresh_tokens()
+        except self.auth.cognito.client.exceptions.NotAuthorizedException as ex:
+            return False
+
+        if self.auth.tokens:
+            self.username = await self.auth.async_get_username()
+            self.customer = await self.get_customer_details()
+            self._store_tokens(self.auth.tokens)
+        return self.customer is not None
+
+    def _store_tokens(self, tokens: "dict[str, Any]"):
+        if not self.token_store:
+            return
+        if self.username:
+            tokens["username"] = self.username
+        self.token_store.save(tokens)
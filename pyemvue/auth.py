@@ -1,8 +1,16 @@
-from datetime import datetime
+import json
+import threading
 import time
 from typing import Any, Optional, Callable
 import jwt
 import requests
+from requests.adapters import HTTPAdapter
+from typing_extensions import Self
+
+from pyemvue.circuit_breaker import CircuitBreaker
+from pyemvue.rate_limiter import RateLimiter, parse_retry_after
+from pyemvue.retry import RetryPolicy, RetryState
+from pyemvue.token_store import TokenStore, _write_json_atomic
 
 # These provide AWS cognito authentication support
 from pycognito import Cognito
@@ -25,7 +33,20 @@ class Auth:
         max_retry_attempts: int = 5,
         initial_retry_delay: float = 0.5,
         max_retry_delay: float = 30.0,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        background_refresh: bool = False,
+        refresh_margin: float = 300.0,
+        jwks_cache_file: Optional[str] = None,
+        jwks_cache_ttl: float = 86400.0,
+        token_store: Optional[TokenStore] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
+        """The max_retry_* arguments are ignored if a retry_policy is provided."""
         self.host = host
         self.connect_timeout = connect_timeout
         self.read_timeout = read_timeout
@@ -33,10 +54,29 @@ class Auth:
         self.max_retry_attempts = max(max_retry_attempts, 1)
         self.initial_retry_delay = max(initial_retry_delay, 0.5)
         self.max_retry_delay = max(max_retry_delay, 0)
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=self.max_retry_attempts,
+            initial_delay=self.initial_retry_delay,
+            max_delay=self.max_retry_delay,
+            jitter=0,
+        )
+        self.background_refresh = background_refresh
+        self.refresh_margin = max(refresh_margin, 0)
         self.pool_wellknown_jwks = None
+        self.jwks_cache_file = jwks_cache_file
+        self.jwks_cache_ttl = max(jwks_cache_ttl, 0)
+        self.token_store = token_store
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
         self.tokens = {}
+        self.session = _create_session(
+            pool_connections, pool_maxsize, pool_block, keep_alive
+        )
 
         self._password = None
+        self._access_token_expiry: Optional["tuple[str, float]"] = None
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._refresh_lock = threading.RLock()
 
         if (
             tokens
@@ -60,62 +100,82 @@ class Auth:
             )
             self._password = password
 
+        if hasattr(self, "cognito"):
+            # route pycognito's token verification through our cached JWKS instead of its own fetch
+            self.cognito.get_key = self._get_jwk
+
     def refresh_tokens(self) -> "dict[str, str]":
         """Refresh and return new tokens."""
-        if self._password:
-            self.cognito.authenticate(password=self._password)
+        with self._refresh_lock:
+            if self._password:
+                self.cognito.authenticate(password=self._password)
 
-        self.cognito.renew_access_token()
-        self._password = None
+            self.cognito.renew_access_token()
+            self._password = None
 
-        tokens = self._extract_tokens_from_cognito()
-        self.tokens = tokens
+            tokens = self._extract_tokens_from_cognito()
+            self.tokens = tokens
 
-        if self.token_updater is not None:
-            self.token_updater(tokens)
+            if self.token_updater is not None:
+                self.token_updater(tokens)
 
-        return tokens
+            if self.background_refresh:
+                self._schedule_background_refresh()
+
+            return tokens
 
     def get_username(self) -> str:
         """Get the username associated with the logged in user."""
         user = self.cognito.get_user()
         return user._data["email"]
 
-    def request(self, method: str, path: str, **kwargs) -> requests.Response:
-        """Make a request."""
+    def request(
+        self,
+        method: str,
+        path: str,
+        retry_state: Optional[RetryState] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Make a request. Pass the retry_state of an enclosing operation to keep within its deadline."""
         if not self.tokens or not self.tokens["access_token"]:
             raise ValueError("Not authenticated. Incorrect username or password?")
 
-        dec_access_token = self._decode_token(self.tokens["access_token"])
-
+        state = retry_state or self.retry_policy.start()
         attempts = 0
-        while attempts < self.max_retry_attempts:
+        while True:
             attempts += 1
-            if datetime.now() > datetime.fromtimestamp(dec_access_token["exp"]):
+            access_token = self.tokens["access_token"]
+            if time.time() > self._get_access_token_expiry():
                 # expired, get new tokens
-                self.tokens = self.refresh_tokens()
+                self._refresh_tokens_if_stale(access_token)
+                access_token = self.tokens["access_token"]
 
-            response = self._do_request(method, path, **kwargs)
+            response = self._guarded_request(method, path, state, **kwargs)
 
             if response.status_code == 401:
                 # if unauthorized, try refreshing the tokens
-                self.tokens = self.refresh_tokens()
+                self._refresh_tokens_if_stale(access_token)
                 # then run the request again with updated tokens
-                response = self._do_request(method, path, **kwargs)
-
-            if response.status_code >= 500:
-                # if server error, retry with exponential backoff
-                delay = min(
-                    self.initial_retry_delay * (2 ** (attempts - 1)),
-                    self.max_retry_delay,
-                )
-                time.sleep(delay)
-                continue
+                response = self._guarded_request(method, path, state, **kwargs)
 
-            if response.status_code < 500:
+            delay = self._retry_delay(path, response, attempts, state)
+            if delay is None:
                 return response
+            time.sleep(delay)
 
-        return response
+    def close(self):
+        """Close the underlying HTTP session and release pooled connections."""
+        self.background_refresh = False
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        self.session.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def _extract_tokens_from_cognito(self) -> "dict[str, Any]":
         return {
@@ -125,7 +185,150 @@ class Auth:
             "token_type": self.cognito.token_type,
         }
 
-    def _do_request(self, method: str, path: str, **kwargs) -> requests.Response:
+    def _guarded_request(
+        self, method: str, path: str, retry_state: RetryState, **kwargs
+    ) -> requests.Response:
+        """Make the request through the circuit breaker, if there is one."""
+        breaker = self.circuit_breaker
+        if not breaker:
+            return self._do_request(method, path, retry_state, **kwargs)
+        breaker.before_request()
+        try:
+            response = self._do_request(method, path, retry_state, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        _record_outcome(breaker, response)
+        return response
+
+    def _retry_delay(
+        self, path: str, response: Any, attempts: int, state: RetryState
+    ) -> Optional[float]:
+        """How long to wait before retrying the request after response, or None to return the response as is."""
+        if response.status_code == 429:
+            # throttled, wait as long as the server asks before retrying
+            delay = self._throttled(path, response, attempts, state)
+            if delay is None:
+                return None
+        elif response.status_code >= 500:
+            # if server error, retry with exponential backoff
+            delay = state.delay(attempts, self.retry_policy)
+        else:
+            if self.rate_limiter:
+                self.rate_limiter.succeeded(path)
+            return None
+
+        if self.circuit_breaker and not self.circuit_breaker.closed:
+            # the API looks to be down, don't wait around to retry
+            return None
+        if not state.can_retry(attempts, delay, self.retry_policy):
+            return None
+        return delay
+
+    def _throttled(
+        self, path: str, response: Any, attempts: int, state: RetryState
+    ) -> Optional[float]:
+        """Handle a 429 response, returns how long to wait before retrying or None if the server asks
+        for a longer wait than the retry policy's max_delay allows."""
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            delay = state.delay(attempts, self.retry_policy)
+        if self.rate_limiter:
+            self.rate_limiter.throttled(path, delay)
+        if delay > self.retry_policy.max_delay:
+            # retrying any sooner would only be throttled again
+            return None
+        return delay
+
+    def _refresh_tokens_if_stale(self, stale_access_token: str) -> "dict[str, str]":
+        """Refresh the tokens unless another thread already replaced stale_access_token while we waited.
+        Concurrent callers share a single refresh and all receive its result."""
+        with self._refresh_lock:
+            if self.tokens.get("access_token") != stale_access_token:
+                return self.tokens
+            if self.token_store is None:
+                return self.refresh_tokens()
+            with self.token_store.lock():
+                # another process sharing the store may have refreshed already
+                if self._use_stored_tokens(stale_access_token):
+                    return self.tokens
+                return self.refresh_tokens()
+
+    def _use_stored_tokens(self, stale_access_token: str) -> bool:
+        """Switch to the tokens in the token store if they are newer than ours and not expired."""
+        try:
+            stored = self.token_store.load() if self.token_store else None
+        except (OSError, ValueError):
+            return False
+        if (
+            not stored
+            or not stored.get("access_token")
+            or not stored.get("id_token")
+            or stored["access_token"] == stale_access_token
+        ):
+            return False
+        try:
+            exp = float(self._decode_token(stored["access_token"])["exp"])
+        except Exception:
+            return False
+        if time.time() > exp:
+            return False
+
+        self.cognito.access_token = stored["access_token"]
+        self.cognito.id_token = stored["id_token"]
+        if stored.get("refresh_token"):
+            self.cognito.refresh_token = stored["refresh_token"]
+        self.tokens = self._extract_tokens_from_cognito()
+        self._access_token_expiry = (stored["access_token"], exp)
+        if self.background_refresh:
+            self._schedule_background_refresh()
+        return True
+
+    def _get_access_token_expiry(self) -> float:
+        """Return the expiry of the current access token, only decoding the JWT when the token changes."""
+        token = self.tokens["access_token"]
+        cached = self._access_token_expiry
+        if cached and cached[0] == token:
+            return cached[1]
+        exp = float(self._decode_token(token)["exp"])
+        self._access_token_expiry = (token, exp)
+        return exp
+
+    def _schedule_background_refresh(self):
+        """Schedule a refresh of the tokens refresh_margin seconds before the access token expires.
+        The margin is capped at half of the token's remaining lifetime, so a margin longer than the
+        lifetime can't make every refresh schedule the next one straight away."""
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        try:
+            remaining = self._get_access_token_expiry() - time.time()
+            delay = remaining - min(self.refresh_margin, remaining / 2)
+        except Exception:
+            # can't tell when the token expires, try again shortly
+            delay = 30.0
+        self._refresh_timer = threading.Timer(max(delay, 0), self._background_refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _background_refresh(self):
+        try:
+            # goes through the token store so processes sharing it refresh only once
+            self._refresh_tokens_if_stale(self.tokens["access_token"])
+        except Exception:
+            # the request path will still refresh on expiry or a 401, just try again later
+            if not self.background_refresh:
+                return
+            self._refresh_timer = threading.Timer(30.0, self._background_refresh)
+            self._refresh_timer.daemon = True
+            self._refresh_timer.start()
+
+    def _do_request(
+        self,
+        method: str,
+        path: str,
+        retry_state: Optional[RetryState] = None,
+        **kwargs,
+    ) -> requests.Response:
         headers = kwargs.get("headers")
 
         if headers is None:
@@ -134,26 +337,77 @@ class Auth:
             headers = dict(headers)
         headers["authtoken"] = self.tokens["id_token"]
 
-        return requests.request(
+        if self.rate_limiter:
+            wait = self.rate_limiter.reserve(path)
+            if wait > 0:
+                time.sleep(retry_state.timeout(wait) if retry_state else wait)
+
+        timeout = (self.connect_timeout, self.read_timeout)
+        if retry_state:
+            timeout = (retry_state.timeout(timeout[0]), retry_state.timeout(timeout[1]))
+
+        return self.session.request(
             method,
             f"{self.host}/{path}",
             **kwargs,
             headers=headers,
-            timeout=(self.connect_timeout, self.read_timeout),
+            timeout=timeout,
         )
 
-    def _decode_token(self, token: str, verify_exp: bool = False) -> dict:
-        """Decode a JWT token and return the payload as a dictionary, without a hard dependency on pycognito."""
+    def _get_jwk(self, kid: Optional[str]) -> "dict[str, Any]":
+        """Find the signing key for the kid, loading the JWKS from the cache file before the network.
+        Refetches the JWKS if the kid is unknown in case the keys have been rotated."""
+        fetched = False
+        if not self.pool_wellknown_jwks:
+            self.pool_wellknown_jwks = self._load_cached_jwks()
         if not self.pool_wellknown_jwks:
-            self.pool_wellknown_jwks = requests.get(
-                USER_POOL_URL + "/.well-known/jwks.json",
-                timeout=5,
-            ).json()
+            self.pool_wellknown_jwks = self._fetch_jwks()
+            fetched = True
+
+        key = _find_jwk(self.pool_wellknown_jwks, kid)
+        if key is None and not fetched:
+            self.pool_wellknown_jwks = self._fetch_jwks()
+            key = _find_jwk(self.pool_wellknown_jwks, kid)
+        if key is None:
+            raise ValueError(f"No signing key found for kid {kid}")
+        return key
+
+    def _load_cached_jwks(self) -> Optional["dict[str, Any]"]:
+        if not self.jwks_cache_file:
+            return None
+        try:
+            with open(self.jwks_cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(data, dict)
+            or "fetched_at" not in data
+            or "jwks" not in data
+            or time.time() - data["fetched_at"] > self.jwks_cache_ttl
+        ):
+            return None
+        return data["jwks"]
+
+    def _fetch_jwks(self) -> "dict[str, Any]":
+        jwks = self.session.get(
+            USER_POOL_URL + "/.well-known/jwks.json",
+            timeout=5,
+        ).json()
+        if self.jwks_cache_file:
+            try:
+                _write_json_atomic(
+                    self.jwks_cache_file, {"fetched_at": time.time(), "jwks": jwks}
+                )
+            except OSError:
+                # the cache is only an optimization
+                pass
+        return jwks
 
+    def _decode_token(self, token: str, verify_exp: bool = False) -> dict:
+        """Decode a JWT token and return the payload as a dictionary, without a hard dependency on pycognito."""
         kid = jwt.get_unverified_header(token).get("kid")
-        keys = self.pool_wellknown_jwks.get("keys")
-        key = list(filter(lambda x: x.get("kid") == kid, keys))[0]
-        hmac_key = jwt.api_jwk.PyJWK(key).key
+        hmac_key = jwt.api_jwk.PyJWK(self._get_jwk(kid)).key
         return jwt.api_jwt.decode(
             token,
             algorithms=["RS256"],
@@ -162,15 +416,30 @@ class Auth:
             options={"verify_exp": verify_exp, "verify_iat": False, "verify_nbf": False},
         )
 
+
 class SimulatedAuth(Auth):
     def __init__(
-        self, host: str, username: Optional[str] = None, password: Optional[str] = None
+        self,
+        host: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
     ):
         self.host = host
         self.username = username
         self.password = password
         self.connect_timeout = 6.03
         self.read_timeout = 10.03
+        self.background_refresh = False
+        self.rate_limiter = None
+        self.circuit_breaker = None
+        self._refresh_timer = None
+        self.session = _create_session(
+            pool_connections, pool_maxsize, pool_block, keep_alive
+        )
         self.tokens = self.refresh_tokens()
 
     def refresh_tokens(self) -> dict[str, str]:
@@ -180,14 +449,51 @@ class SimulatedAuth(Auth):
         """Get the username associated with the logged in user."""
         return self.username or "simulator"
 
-    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+    def request(
+        self,
+        method: str,
+        path: str,
+        retry_state: Optional[RetryState] = None,
+        **kwargs,
+    ) -> requests.Response:
         """Make a request."""
-        response = self._do_request(method, path, **kwargs)
+        response = self._do_request(method, path, retry_state, **kwargs)
 
         if response.status_code == 401:
             # if unauthorized, try refreshing the tokens
             self.tokens = self.refresh_tokens()
             # then run the request again with updated tokens
-            response = self._do_request(method, path, **kwargs)
+            response = self._do_request(method, path, retry_state, **kwargs)
 
         return response
+
+
+def _record_outcome(breaker: CircuitBreaker, response: Any):
+    """Tell the circuit breaker whether the API answered. Throttling says nothing about its health."""
+    if response.status_code >= 500:
+        breaker.record_failure()
+    elif response.status_code != 429:
+        breaker.record_success()
+
+
+def _find_jwk(jwks: "dict[str, Any]", kid: Optional[str]) -> Optional["dict[str, Any]"]:
+    return next((k for k in jwks.get("keys", []) if k.get("kid") == kid), None)
+
+
+def _create_session(
+    pool_connections: int, pool_maxsize: int, pool_block: bool, keep_alive: bool
+) -> requests.Session:
+    """Create a session with a connection pool so repeated calls reuse TCP/TLS connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=max(pool_connections, 1),
+        pool_maxsize=max(pool_maxsize, 1),
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # usage payloads are large and compress well
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
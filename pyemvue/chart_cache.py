@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class ChartUsageCache(object):
+    """Stores chart usage points in a local SQLite database so that history is only fetched once.
+    Points are keyed by device, channel, scale, unit and the start of their time bucket in epoch seconds.
+    Only closed buckets are stored: a bucket must have ended at least settle_time seconds ago,
+    since the most recent data can still change as devices report in. Closed buckets without usage are stored as
+    NULL so that gaps in the history, such as an offline device, aren't requested again."""
+
+    def __init__(self, path: str, settle_time: float = 300.0):
+        self.path = path
+        self.settle_time = max(settle_time, 0)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS chart_usage (
+                    device_gid INTEGER NOT NULL,
+                    channel_num TEXT NOT NULL,
+                    scale TEXT NOT NULL,
+                    unit TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    usage REAL,
+                    PRIMARY KEY (device_gid, channel_num, scale, unit, bucket)
+                ) WITHOUT ROWID"""
+            )
+
+    def get(
+        self,
+        device_gid: int,
+        channel_num: str,
+        scale: str,
+        unit: str,
+        first_bucket: int,
+        last_bucket: int,
+    ) -> "dict[int, Optional[float]]":
+        """Return the cached points with buckets between first_bucket and last_bucket inclusive.
+        Buckets that closed without usage are included with a value of None."""
+        with self._lock:
+            rows = self._connection.execute(
+                """SELECT bucket, usage FROM chart_usage
+                WHERE device_gid = ? AND channel_num = ? AND scale = ? AND unit = ? AND bucket BETWEEN ? AND ?""",
+                (device_gid, channel_num, scale, unit, first_bucket, last_bucket),
+            ).fetchall()
+        return dict(rows)
+
+    def put(
+        self,
+        device_gid: int,
+        channel_num: str,
+        scale: str,
+        unit: str,
+        step: int,
+        points: "dict[int, Optional[float]]",
+    ):
+        """Store the points of buckets that have closed, including those without a value.
+        Open buckets are not stored so they are fetched again."""
+        closed_before = time.time() - self.settle_time - step
+        rows = [
+            (device_gid, channel_num, scale, unit, bucket, usage)
+            for bucket, usage in points.items()
+            if bucket <= closed_before
+        ]
+        if not rows:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO chart_usage VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def clear(self):
+        """Remove everything from the cache."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM chart_usage")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def missing_ranges(
+    cached: "dict[int, Optional[float]]",
+    first_bucket: int,
+    last_bucket: int,
+    step: int,
+) -> "list[tuple[int, int]]":
+    """Return the runs of buckets between first_bucket and last_bucket, inclusive, that are not in cached.
+    Buckets cached as None are known gaps and not missing."""
+    ranges = []
+    run_start = None
+    for bucket in range(first_bucket, last_bucket + step, step):
+        if bucket not in cached:
+            if run_start is None:
+                run_start = bucket
+        elif run_start is not None:
+            ranges.append((run_start, bucket - step))
+            run_start = None
+    if run_start is not None:
+        ranges.append((run_start, last_bucket))
+    return ranges
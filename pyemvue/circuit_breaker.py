@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a request while the API is considered down."""
+
+    def __init__(self, message: str, maintenance_message: Optional[str] = None):
+        super().__init__(message)
+        self.maintenance_message = maintenance_message
+
+
+class CircuitBreaker(object):
+    """Stops sending requests after repeated server failures so that callers fail fast during outages.
+    After failure_threshold consecutive failures the circuit opens and requests raise CircuitOpenError.
+    Once recovery_timeout has passed a single probe request is let through (half open), closing the circuit again if it succeeds.
+    While open the maintenance_checker is consulted at most once every maintenance_check_interval seconds and
+    the circuit stays open for as long as it reports maintenance."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        maintenance_check_interval: float = 60.0,
+        maintenance_checker: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.recovery_timeout = max(recovery_timeout, 0)
+        self.maintenance_check_interval = max(maintenance_check_interval, 0)
+        self.maintenance_checker = maintenance_checker
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.maintenance_message: Optional[str] = None
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self._maintenance_checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CircuitBreaker.CLOSED
+
+    def before_request(self):
+        """Call before making a request, raises CircuitOpenError if the request should not be made."""
+        checker = self._maintenance_check_due()
+        if checker:
+            # the check makes a request of its own, other callers keep failing fast meanwhile
+            try:
+                message = checker()
+            except Exception:
+                # can't tell, fall back to probing the API itself
+                message = None
+            with self._lock:
+                if self.state != CircuitBreaker.CLOSED:
+                    self.maintenance_message = message
+
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return
+            now = time.monotonic()
+            if (
+                self.state == CircuitBreaker.HALF_OPEN
+                and now - self._probe_started_at < self.recovery_timeout
+            ):
+                # only the probe request is allowed through
+                raise CircuitOpenError("API unavailable, waiting on a probe request")
+
+            if self.maintenance_message:
+                self._opened_at = now
+                raise CircuitOpenError(
+                    f"API down for maintenance: {self.maintenance_message}",
+                    self.maintenance_message,
+                )
+            if now - self._opened_at < self.recovery_timeout:
+                raise CircuitOpenError("API unavailable, failing fast")
+            self.state = CircuitBreaker.HALF_OPEN
+            self._probe_started_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+            self.maintenance_message = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if (
+                self.state == CircuitBreaker.HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                self.state = CircuitBreaker.OPEN
+                self._opened_at = time.monotonic()
+
+    def _maintenance_check_due(self) -> Optional[Callable[[], Optional[str]]]:
+        """Returns the maintenance_checker if it should be called now and marks it as checked, so that only one caller
+        runs it per interval. It is called outside the lock since it can take as long as a request."""
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED or not self.maintenance_checker:
+                return None
+            now = time.monotonic()
+            if (
+                self.state == CircuitBreaker.HALF_OPEN
+                and now - self._probe_started_at < self.recovery_timeout
+            ):
+                return None
+            if (
+                self._maintenance_checked_at is not None
+                and now - self._maintenance_checked_at
+                < self.maintenance_check_interval
+            ):
+                return None
+            self._maintenance_checked_at = now
+            return self.maintenance_checker
@@ -1,7 +1,9 @@
+import copy
 import datetime
-from typing import Any, Optional
+from typing import Any, Dict, Iterator, Mapping, Optional
 from typing_extensions import Self
-from dateutil.parser import parse
+
+from pyemvue.timestamps import parse_timestamp
 
 
 class VueDevice(object):
@@ -76,7 +78,7 @@ class VueDevice(object):
                 self.connected = con["connected"]
             try:
                 if "offlineSince" in con and con["offlineSince"]:
-                    self.offline_since = parse(con["offlineSince"])
+                    self.offline_since = parse_timestamp(con["offlineSince"])
             except:
                 self.offline_since = datetime.datetime.min
         return self
@@ -178,12 +180,25 @@ class VueDeviceChannel(object):
 
 
 class VueUsageDevice(VueDevice):
+    """A device in a getDeviceListUsages response. Only the fields in that response are stored, in slots, to keep
+    the many snapshots of usage small. The other VueDevice attributes read as their defaults."""
+
+    __slots__ = ("device_gid", "timestamp", "channels")
+
     def __init__(self, gid=0, timestamp: Optional[datetime.datetime] = None):
-        super().__init__(gid=gid)
+        # VueDevice.__init__ is skipped on purpose, see __getattr__
+        self.device_gid = gid
         self.timestamp = timestamp
         self.channels: dict[str, VueDeviceChannelUsage] = {}
 
-    def from_json_dictionary(self, js: "dict[str, Any]") -> Self:
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes that were never set
+        return _default_attribute(self, VueDevice, name)
+
+    def from_json_dictionary(
+        self, js: "dict[str, Any]", lazy_nested: bool = False
+    ) -> Self:
+        """If lazy_nested is set the nested devices of the channels are only decoded when they are read."""
         if not js:
             return self
         if "deviceGid" in js:
@@ -193,12 +208,25 @@ class VueUsageDevice(VueDevice):
                 if channel:
                     populated_channel = VueDeviceChannelUsage(
                         timestamp=self.timestamp
-                    ).from_json_dictionary(channel)
+                    ).from_json_dictionary(channel, lazy_nested)
                     self.channels[populated_channel.channel_num] = populated_channel
         return self
 
 
 class VueDeviceChannelUsage(VueDeviceChannel):
+    """The usage of a channel in a getDeviceListUsages response. Like VueUsageDevice only the fields in the response
+    are stored, in slots, and the other VueDeviceChannel attributes read as their defaults."""
+
+    __slots__ = (
+        "name",
+        "device_gid",
+        "usage",
+        "channel_num",
+        "percentage",
+        "timestamp",
+        "nested_devices",
+    )
+
     def __init__(
         self,
         gid: int = 0,
@@ -207,17 +235,24 @@ class VueDeviceChannelUsage(VueDeviceChannel):
         name="",
         timestamp: Optional[datetime.datetime] = None,
     ):
-        super().__init__(gid=gid, name=name, channelNum=channelNum)
+        # VueDeviceChannel.__init__ is skipped on purpose, see __getattr__
         self.name = name
         self.device_gid: int = gid
         self.usage: float = usage
         self.channel_num = channelNum
         self.percentage = 0.0
         self.timestamp = timestamp
-        self.nested_devices = {}
+        self.nested_devices: Mapping[int, VueUsageDevice] = {}
 
-    def from_json_dictionary(self, js: "dict[str, Any]") -> Self:
-        """Populate device channel usage data from a dictionary extracted from the response json."""
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes that were never set
+        return _default_attribute(self, VueDeviceChannel, name)
+
+    def from_json_dictionary(
+        self, js: "dict[str, Any]", lazy_nested: bool = False
+    ) -> Self:
+        """Populate device channel usage data from a dictionary extracted from the response json.
+        If lazy_nested is set nested_devices is a LazyNestedDevices that decodes each nested device when it is read."""
         if not js:
             return self
         if "channelUsages" in js:
@@ -236,6 +271,11 @@ class VueDeviceChannelUsage(VueDeviceChannel):
             self.percentage = js["percentage"]
         # Nested device handling
         if "nestedDevices" in js and js["nestedDevices"]:
+            if lazy_nested:
+                self.nested_devices = LazyNestedDevices(
+                    js["nestedDevices"], self.timestamp
+                )
+                return self
             for device in js["nestedDevices"]:
                 if device:
                     populated = VueUsageDevice(
@@ -245,6 +285,61 @@ class VueDeviceChannelUsage(VueDeviceChannel):
         return self
 
 
+class LazyNestedDevices(Mapping[int, VueUsageDevice]):
+    """The nested devices of a channel usage, keyed by device gid like the dict it replaces.
+    The raw json of the devices is kept and each device is only decoded the first time it is read."""
+
+    __slots__ = ("_raw", "_timestamp", "_index", "_decoded")
+
+    def __init__(
+        self,
+        raw: "list[dict[str, Any]]",
+        timestamp: Optional[datetime.datetime] = None,
+    ):
+        self._raw = raw
+        self._timestamp = timestamp
+        self._index: Optional[dict[int, dict[str, Any]]] = None
+        self._decoded: dict[int, VueUsageDevice] = {}
+
+    def _devices(self) -> "dict[int, dict[str, Any]]":
+        if self._index is None:
+            # a gid listed twice keeps the last device, as the eager dict does
+            self._index = {
+                device.get("deviceGid", 0): device for device in self._raw if device
+            }
+        return self._index
+
+    def __getitem__(self, device_gid: int) -> VueUsageDevice:
+        device = self._decoded.get(device_gid)
+        if device is None:
+            device = VueUsageDevice(timestamp=self._timestamp).from_json_dictionary(
+                self._devices()[device_gid], lazy_nested=True
+            )
+            self._decoded[device_gid] = device
+        return device
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._devices())
+
+    def __len__(self) -> int:
+        return len(self._devices())
+
+    def __repr__(self) -> str:
+        return f"LazyNestedDevices({len(self)} devices, {len(self._decoded)} decoded)"
+
+
+class DeviceListUsage(Dict[int, VueUsageDevice]):
+    """The usage of each device keyed by device gid, as returned by get_device_list_usage.
+    missing_channels lists the (device_gid, channel_num) of channels that still had no usage when the retries ran out.
+    missing_devices lists the gids of requested devices that the response left out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.missing_channels: list[tuple[int, str]] = []
+        self.missing_devices: list[int] = []
+
+
 class OutletDevice(object):
     def __init__(self, gid: int = 0, on: bool = False):
         self.device_gid = gid
@@ -468,3 +563,22 @@ class VehicleStatus(object):
             "chargeCurrentRequest": self.charge_current_request,
             "chargeCurrentRequestMax": self.charge_current_request_max,
         }
+
+
+_default_instances: "dict[type, Any]" = {}
+
+
+def _default_attribute(instance: Any, cls: type, name: str) -> Any:
+    """The value an attribute has on a freshly constructed instance of cls, so that the lean usage models
+    still answer for the attributes of the classes they extend."""
+    if name.startswith("__"):
+        raise AttributeError(name)
+    default = _default_instances.get(cls)
+    if default is None:
+        default = _default_instances[cls] = cls()
+    try:
+        return copy.copy(default.__dict__[name])
+    except KeyError:
+        raise AttributeError(
+            f"'{type(instance).__name__}' object has no attribute '{name}'"
+        ) from None
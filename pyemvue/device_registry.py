@@ -0,0 +1,122 @@
+from typing import Any, Mapping, Optional
+
+from pyemvue.device import (
+    ChannelType,
+    ChargerDevice,
+    OutletDevice,
+    VueDevice,
+    VueDeviceChannel,
+    VueDeviceChannelUsage,
+    VueUsageDevice,
+)
+
+
+class DeviceRegistry(object):
+    """Indexes the devices returned by get_devices so that devices, channels, child devices and channel types
+    can be looked up directly instead of by searching the lists.
+    A device listed more than once under the same gid is merged into the first one by adding its channels to it.
+    """
+
+    def __init__(
+        self,
+        devices: Optional["list[VueDevice]"] = None,
+        channel_types: Optional["list[ChannelType]"] = None,
+    ):
+        self.devices: dict[int, VueDevice] = {}
+        self.channels: dict[tuple[int, str], VueDeviceChannel] = {}
+        self.channel_types: dict[int, ChannelType] = {}
+        self.usage: dict[tuple[int, str], VueDeviceChannelUsage] = {}
+        self._children: dict[tuple[int, str], list[VueDevice]] = {}
+        self._children_by_parent: dict[int, list[VueDevice]] = {}
+        self._channels_by_type: dict[int, list[VueDeviceChannel]] = {}
+        for device in devices or []:
+            self.add(device)
+        for channel_type in channel_types or []:
+            self.channel_types[channel_type.channel_type_gid] = channel_type
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def __contains__(self, device_gid: int) -> bool:
+        return device_gid in self.devices
+
+    def add(self, device: VueDevice) -> VueDevice:
+        """Add the device to the registry and return the registered device for its gid."""
+        registered = self.devices.get(device.device_gid)
+        if registered is None:
+            registered = self.devices[device.device_gid] = device
+            if device.parent_device_gid:
+                self._children.setdefault(
+                    (device.parent_device_gid, device.parent_channel_num), []
+                ).append(device)
+                self._children_by_parent.setdefault(
+                    device.parent_device_gid, []
+                ).append(device)
+        elif registered is not device:
+            registered.channels += device.channels
+        for channel in device.channels:
+            self.channels.setdefault((channel.device_gid, channel.channel_num), channel)
+            self._channels_by_type.setdefault(channel.channel_type_gid, []).append(
+                channel
+            )
+        return registered
+
+    def get(self, device_gid: int) -> Optional[VueDevice]:
+        return self.devices.get(device_gid)
+
+    def get_channel(
+        self, device_gid: int, channel_num: str
+    ) -> Optional[VueDeviceChannel]:
+        return self.channels.get((device_gid, channel_num))
+
+    def get_children(
+        self, parent_device_gid: int, parent_channel_num: Optional[str] = None
+    ) -> "list[VueDevice]":
+        """The devices attached to the parent device, or to one of its channels if parent_channel_num is given."""
+        if parent_channel_num is not None:
+            return list(self._children.get((parent_device_gid, parent_channel_num), []))
+        return list(self._children_by_parent.get(parent_device_gid, []))
+
+    def get_channels_of_type(self, channel_type_gid: int) -> "list[VueDeviceChannel]":
+        return list(self._channels_by_type.get(channel_type_gid, []))
+
+    def get_channel_type(self, channel: VueDeviceChannel) -> Optional[ChannelType]:
+        return self.channel_types.get(channel.channel_type_gid)
+
+    def get_usage(
+        self, device_gid: int, channel_num: str
+    ) -> Optional[VueDeviceChannelUsage]:
+        """The latest usage merged in with merge_usage for the channel."""
+        return self.usage.get((device_gid, channel_num))
+
+    def merge_status(
+        self,
+        devices_connected: "list[dict[str, Any]]",
+        outlets: Optional["list[OutletDevice]"] = None,
+        chargers: Optional["list[ChargerDevice]"] = None,
+    ):
+        """Update the devices from the parts of a devices status response."""
+        for raw_device_data in devices_connected:
+            if raw_device_data and raw_device_data.get("deviceGid"):
+                device = self.devices.get(raw_device_data["deviceGid"])
+                if device:
+                    device.connected = raw_device_data["connected"]
+                    device.offline_since = raw_device_data["offlineSince"]
+        for outlet in outlets or []:
+            device = self.devices.get(outlet.device_gid)
+            if device:
+                device.outlet = outlet
+        for charger in chargers or []:
+            device = self.devices.get(charger.device_gid)
+            if device:
+                device.ev_charger = charger
+
+    def merge_usage(self, usage_devices: "Mapping[int, VueUsageDevice]"):
+        """Keep the usage of every channel, including the channels of nested devices, from get_device_list_usage."""
+        for usage_device in usage_devices.values():
+            for channel_usage in usage_device.channels.values():
+                self.usage[
+                    (usage_device.device_gid, channel_usage.channel_num)
+                ] = channel_usage
+                if channel_usage.nested_devices:
+                    self.merge_usage(channel_usage.nested_devices)
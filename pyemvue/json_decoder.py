@@ -0,0 +1,31 @@
+import json
+from typing import Any, Union
+
+# Use the fastest json library that is installed. orjson and msgspec decode
+# straight from bytes, skipping the str decode that json.loads needs.
+try:
+    import orjson
+
+    BACKEND = "orjson"
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Decode json using the fastest available backend."""
+        return orjson.loads(data)
+
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        _decoder = msgspec.json.Decoder()
+
+        def loads(data: Union[bytes, str]) -> Any:
+            """Decode json using the fastest available backend."""
+            return _decoder.decode(data)
+
+    except ImportError:
+        BACKEND = "json"
+
+        def loads(data: Union[bytes, str]) -> Any:
+            """Decode json using the fastest available backend."""
+            return json.loads(data)
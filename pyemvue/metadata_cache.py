@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from typing import Any, Optional
+
+from pyemvue.token_store import _write_json_atomic
+
+DEVICES = "devices"
+DEVICE_PROPERTIES = "device_properties"
+CHANNEL_TYPES = "channel_types"
+CUSTOMER = "customer"
+
+# Seconds that each type of metadata is reused before fetching it again
+DEFAULT_METADATA_TTLS = {
+    DEVICES: 3600.0,
+    DEVICE_PROPERTIES: 86400.0,
+    CHANNEL_TYPES: 604800.0,
+    CUSTOMER: 86400.0,
+}
+
+
+class MetadataCache(object):
+    """Caches the responses for metadata that rarely changes: the devices, their properties, the channel types and the customer.
+    The raw json is cached so that every caller gets its own freshly parsed objects.
+    If path is given the cache is kept in that file so that it survives restarts. A cache file belongs to a single account.
+    """
+
+    def __init__(
+        self, ttls: Optional["dict[str, float]"] = None, path: Optional[str] = None
+    ):
+        """ttls overrides the time to live in seconds of the types in DEFAULT_METADATA_TTLS."""
+        self.ttls = dict(DEFAULT_METADATA_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.path = path
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, kind: str, key: Any = None) -> Optional[Any]:
+        """Return the cached json for the type of metadata and key, or None if it isn't cached or has expired."""
+        with self._lock:
+            entry = self._entries.get(_entry_key(kind, key))
+        if not entry or time.time() - entry[0] >= self.ttls.get(kind, 0):
+            return None
+        return entry[1]
+
+    def put(self, kind: str, value: Any, key: Any = None):
+        with self._lock:
+            self._entries[_entry_key(kind, key)] = (time.time(), value)
+            self._save()
+
+    def invalidate(self, kind: Optional[str] = None, key: Any = None):
+        """Drop the cached json for the type and key, every key of the type if key is None or everything if kind is None."""
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            elif key is not None:
+                self._entries.pop(_entry_key(kind, key), None)
+            else:
+                prefix = kind + ":"
+                for entry_key in list(self._entries):
+                    if entry_key == kind or entry_key.startswith(prefix):
+                        del self._entries[entry_key]
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+            self._entries = {
+                entry_key: (float(entry[0]), entry[1])
+                for entry_key, entry in stored.items()
+            }
+        except (OSError, ValueError, TypeError, IndexError, AttributeError):
+            # missing or unreadable, start empty
+            self._entries = {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            _write_json_atomic(self.path, self._entries)
+        except OSError:
+            # the cache still works in memory
+            pass
+
+
+def _entry_key(kind: str, key: Any) -> str:
+    return kind if key is None else f"{kind}:{key}"
@@ -0,0 +1,163 @@
+import datetime
+import threading
+import time
+from typing import Callable, Iterator, Mapping, NamedTuple, Optional, Union
+
+from pyemvue.device import DeviceListUsage, VueUsageDevice
+from pyemvue.enums import Scale, Unit
+from pyemvue.pyemvue import SCALE_STEPS, PyEmVue
+
+UsageCallback = Callable[[datetime.datetime, DeviceListUsage], None]
+ErrorCallback = Callable[[datetime.datetime, Exception], None]
+
+
+class UsageSample(NamedTuple):
+    """The usage of a single channel at an instant."""
+
+    timestamp: datetime.datetime
+    device_gid: int
+    channel_num: str
+    usage: Optional[float]
+
+
+class PollSchedule(object):
+    """The instants to poll, aligned to the boundaries of a scale.
+    Every instant is computed from the clock rather than by sleeping a fixed interval, so time spent polling doesn't add up to drift.
+    """
+
+    def __init__(self, scale: str, offset: float = 0.0):
+        """offset is how many seconds after each boundary to poll it."""
+        if scale not in SCALE_STEPS:
+            raise ValueError(
+                f"Can't poll at the {scale} scale, it has no fixed length"
+            )
+        self.step = SCALE_STEPS[scale].total_seconds()
+        self.offset = max(offset, 0)
+        self.skipped = 0
+        self._next: Optional[float] = None
+
+    def wait_time(self) -> float:
+        """Seconds until the next instant is due."""
+        now = time.time()
+        if self._next is None:
+            self._next = ((now - self.offset) // self.step + 1) * self.step
+        return max(self._next + self.offset - now, 0)
+
+    def take(self) -> datetime.datetime:
+        """Return the instant to poll now and move on to the next one.
+        If polling fell behind, the instants that were missed are skipped in favor of the latest one that is due."""
+        due = (time.time() - self.offset) // self.step * self.step
+        if self._next is None:
+            self._next = due
+        elif due > self._next:
+            self.skipped += round((due - self._next) / self.step)
+            self._next = due
+        instant = self._next
+        self._next += self.step
+        return datetime.datetime.fromtimestamp(instant, datetime.timezone.utc)
+
+
+class UsagePoller(object):
+    """Polls get_device_list_usage for the usage of the devices at every boundary of the scale, passing each
+    boundary as the instant so that consecutive snapshots line up exactly.
+    Snapshots are passed to the callbacks and yielded when iterating over the poller. Iteration polls in the calling thread,
+    start() polls in a background thread instead. When a poll or the callbacks take longer than a step the missed
+    instants are skipped, they are counted in skipped_ticks."""
+
+    def __init__(
+        self,
+        vue: PyEmVue,
+        device_gids: Union[str, "list[str]"],
+        scale=Scale.MINUTE.value,
+        unit=Unit.KWH.value,
+        offset: float = 0.0,
+        max_retry_attempts: int = 2,
+        on_error: Optional[ErrorCallback] = None,
+    ):
+        """offset is how many seconds after each boundary to poll it, allowing the devices time to report.
+        Errors raised while polling are passed to on_error and that instant is skipped, without it they are raised.
+        """
+        self.vue = vue
+        self.device_gids = device_gids
+        self.scale = scale
+        self.unit = unit
+        self.offset = offset
+        self.max_retry_attempts = max_retry_attempts
+        self.on_error = on_error
+        # checks the scale up front
+        self.schedule = PollSchedule(scale, offset)
+        self._callbacks: list[UsageCallback] = []
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def skipped_ticks(self) -> int:
+        return self.schedule.skipped
+
+    def add_callback(self, callback: UsageCallback):
+        """Call callback with the instant and the usage of every snapshot."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: UsageCallback):
+        self._callbacks.remove(callback)
+
+    def poll(self, instant: datetime.datetime) -> DeviceListUsage:
+        """Get the usage at the instant and pass it to the callbacks."""
+        usage = self.vue.get_device_list_usage(
+            self.device_gids,
+            instant,
+            self.scale,
+            self.unit,
+            max_retry_attempts=self.max_retry_attempts,
+        )
+        for callback in list(self._callbacks):
+            callback(instant, usage)
+        return usage
+
+    def __iter__(self) -> Iterator["tuple[datetime.datetime, DeviceListUsage]"]:
+        self.schedule = PollSchedule(self.scale, self.offset)
+        while not self._stopped.wait(self.schedule.wait_time()):
+            instant = self.schedule.take()
+            try:
+                usage = self.poll(instant)
+            except Exception as ex:
+                if not self.on_error:
+                    raise
+                self.on_error(instant, ex)
+                continue
+            yield instant, usage
+
+    def run(self):
+        """Poll until stop() is called, delivering the snapshots to the callbacks only."""
+        for _ in self:
+            pass
+
+    def start(self):
+        """Poll in a background thread until stop() is called."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="UsagePoller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop polling, waiting up to timeout seconds for a poll in progress to finish."""
+        self._stopped.set()
+        thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+
+
+def iter_channel_usage(
+    devices: "Mapping[int, VueUsageDevice]", timestamp: datetime.datetime
+) -> Iterator[UsageSample]:
+    """Flatten the usage of the devices, including their nested devices, into a sample per channel."""
+    for device in devices.values():
+        for channel in device.channels.values():
+            yield UsageSample(
+                timestamp, device.device_gid, channel.channel_num, channel.usage
+            )
+            if channel.nested_devices:
+                yield from iter_channel_usage(channel.nested_devices, timestamp)
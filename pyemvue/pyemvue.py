@@ -1,16 +1,33 @@
 import time
-from typing import Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Union
 import requests
 import datetime
-import json
-from dateutil.parser import parse
+import os
+from typing_extensions import Self
 
 # Our files
 from pyemvue.auth import Auth, SimulatedAuth
 from pyemvue.enums import Scale, Unit
+from pyemvue.json_decoder import loads as json_loads
+from pyemvue.timestamps import format_timestamp, parse_timestamp
+from pyemvue.chart_cache import ChartUsageCache, missing_ranges
+from pyemvue.metadata_cache import (
+    CHANNEL_TYPES,
+    CUSTOMER,
+    DEVICE_PROPERTIES,
+    DEVICES,
+    MetadataCache,
+)
+from pyemvue.circuit_breaker import CircuitBreaker
+from pyemvue.rate_limiter import RateLimiter
+from pyemvue.retry import RetryPolicy, RetryState
+from pyemvue.token_store import FileTokenStore, TokenStore
 from pyemvue.customer import Customer
+from pyemvue.device_registry import DeviceRegistry
 from pyemvue.device import (
     ChargerDevice,
+    DeviceListUsage,
     VueDevice,
     OutletDevice,
     VueDeviceChannel,
@@ -21,6 +38,10 @@ from pyemvue.device import (
     VehicleStatus,
 )
 
+if TYPE_CHECKING:
+    from pyemvue.poller import UsageSample
+    from pyemvue.usage_frame import UsageFrame
+
 API_ROOT = "https://api.emporiaenergy.com"
 API_CHANNELS = "devices/{deviceGid}/channels"
 API_CHANNEL_TYPES = "devices/channels/channeltypes"
@@ -39,47 +60,121 @@ API_MAINTENANCE = (
     "https://s3.amazonaws.com/com.emporiaenergy.manual.ota/maintenance/maintenance.json"
 )
 
+# Length of a single data point for the scales with a fixed length
+SCALE_STEPS = {
+    Scale.SECOND.value: datetime.timedelta(seconds=1),
+    Scale.MINUTE.value: datetime.timedelta(minutes=1),
+    Scale.MINUTES_15.value: datetime.timedelta(minutes=15),
+    Scale.HOUR.value: datetime.timedelta(hours=1),
+}
+# Longest range requested in a single getChartUsage call, longer ranges are split up and stitched back together
+CHART_USAGE_MAX_WINDOWS = {
+    Scale.SECOND.value: datetime.timedelta(hours=1),
+    Scale.MINUTE.value: datetime.timedelta(days=2),
+    Scale.MINUTES_15.value: datetime.timedelta(days=30),
+    Scale.HOUR.value: datetime.timedelta(days=90),
+}
+# Longest getDeviceListUsages path and query sent, longer lists of devices are split into batches
+DEVICE_LIST_USAGE_MAX_URL_LENGTH = 2000
+# Cached points that may be requested again to fill the gaps on either side of them in a single request
+CHART_CACHE_MAX_REFETCH = 60
+
 
 class PyEmVue(object):
-    def __init__(self, connect_timeout: float = 6.03, read_timeout: float = 10.03):
+    def __init__(
+        self,
+        connect_timeout: float = 6.03,
+        read_timeout: float = 10.03,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        background_token_refresh: bool = False,
+        token_refresh_margin: float = 300.0,
+        jwks_cache_file: Optional[str] = None,
+        jwks_cache_ttl: float = 86400.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        chart_usage_cache: Optional[ChartUsageCache] = None,
+        metadata_cache: Optional[MetadataCache] = None,
+        lazy_nested_devices: bool = False,
+    ):
+        """The pool_* and keep_alive options configure the pooled HTTP session used for all API calls.
+        pool_maxsize is the maximum number of connections kept open per host.
+        If background_token_refresh is enabled the tokens are renewed token_refresh_margin seconds
+        before they expire so that requests never wait on a refresh. The margin is capped at half of the
+        remaining lifetime of the token.
+        The token signing keys are cached for jwks_cache_ttl seconds in jwks_cache_file, which defaults to
+        a .jwks.json file next to the token_storage_file passed to login.
+        A RateLimiter can be provided to limit how fast requests are sent, it is shared by all calls.
+        A RetryPolicy replaces the default retry behavior, its deadline bounds each operation including all retries.
+        A CircuitBreaker makes calls fail fast with CircuitOpenError while the API is down. Unless it already has one,
+        it is given a maintenance_checker that checks the maintenance status.
+        A ChartUsageCache stores chart usage locally so that get_chart_usage only requests the points it doesn't have yet.
+        A MetadataCache reuses the devices, device properties, channel types and customer details until they expire.
+        With lazy_nested_devices the nested devices in get_device_list_usage are only decoded when they are read."""
         self.username = None
         self.token_storage_file = None
+        self.token_store: Optional[TokenStore] = None
         self.customer = None
         self.connect_timeout = connect_timeout
         self.read_timeout = read_timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.background_token_refresh = background_token_refresh
+        self.token_refresh_margin = token_refresh_margin
+        self.jwks_cache_file = jwks_cache_file
+        self.jwks_cache_ttl = jwks_cache_ttl
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.chart_usage_cache = chart_usage_cache
+        self.metadata_cache = metadata_cache
+        self.lazy_nested_devices = lazy_nested_devices
+        self._maintenance_checked: Optional["tuple[float, Optional[str]]"] = None
+        if circuit_breaker and not circuit_breaker.maintenance_checker:
+            circuit_breaker.maintenance_checker = self.down_for_maintenance
 
-    def down_for_maintenance(self) -> Optional[str]:
-        """Checks to see if the API is down for maintenance, returns the reported message if present."""
-        response = requests.get(API_MAINTENANCE)
-        if response.status_code == 404:
-            return None
-        if response.text:
-            j = response.json()
-            if "msg" in j:
-                return j["msg"]
+    def close(self):
+        """Close the HTTP session and release any pooled connections."""
+        auth: Optional[Auth] = getattr(self, "auth", None)
+        if auth:
+            auth.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def down_for_maintenance(self, max_age: float = 0.0) -> Optional[str]:
+        """Checks to see if the API is down for maintenance, returns the reported message if present.
+        A result from the last max_age seconds is reused instead of checking again."""
+        checked = self._maintenance_checked
+        if checked and time.monotonic() - checked[0] < max_age:
+            return checked[1]
+        auth: Optional[Auth] = getattr(self, "auth", None)
+        message = _get_maintenance_message(
+            auth.session if auth else None, (self.connect_timeout, self.read_timeout)
+        )
+        self._maintenance_checked = (time.monotonic(), message)
+        return message
 
     def get_devices(self) -> "list[VueDevice]":
         """Get all devices under the current customer account."""
-        response = self.auth.request("get", API_CUSTOMER_DEVICES)
-        response.raise_for_status()
-        devices: list[VueDevice] = []
-        if response.text:
-            j = response.json()
-            if "devices" in j:
-                for dev in j["devices"]:
-                    devices.append(VueDevice().from_json_dictionary(dev))
-                    if "devices" in dev:
-                        for subdev in dev["devices"]:
-                            devices.append(VueDevice().from_json_dictionary(subdev))
-        return devices
+        j = self._get_metadata(DEVICES, API_CUSTOMER_DEVICES)
+        if j is not None:
+            return _parse_devices(j)
+        return []
 
     def populate_device_properties(self, device: VueDevice) -> VueDevice:
         """Get details about a specific device"""
         url = API_DEVICE_PROPERTIES.format(deviceGid=device.device_gid)
-        response = self.auth.request("get", url)
-        response.raise_for_status()
-        if response.text:
-            j = response.json()
+        j = self._get_metadata(DEVICE_PROPERTIES, url, device.device_gid)
+        if j is not None:
             device.populate_location_properties_from_json(j)
         return device
 
@@ -87,21 +182,36 @@ class PyEmVue(object):
         """Update the channel with the provided state."""
         url = API_CHANNELS.format(deviceGid=channel.device_gid)
         response = self.auth.request("put", url, json=channel.as_dictionary())
+        if self.metadata_cache:
+            self.metadata_cache.invalidate(DEVICES)
         response.raise_for_status()
-        if response.text:
-            j = response.json()
+        if response.content:
+            j = json_loads(response.content)
             channel.from_json_dictionary(j)
         return channel
 
     def get_customer_details(self) -> Optional[Customer]:
         """Get details for the current customer."""
-        response = self.auth.request("get", API_CUSTOMER)
-        response.raise_for_status()
-        if response.text:
-            j = response.json()
+        j = self._get_metadata(CUSTOMER, API_CUSTOMER)
+        if j is not None:
             return Customer().from_json_dictionary(j)
         return None
 
+    def _get_metadata(self, kind: str, url: str, key: Any = None) -> Optional[Any]:
+        """Get the json response for the url, using the metadata cache if there is one."""
+        if self.metadata_cache:
+            j = self.metadata_cache.get(kind, key)
+            if j is not None:
+                return j
+        response = self.auth.request("get", url)
+        response.raise_for_status()
+        if not response.content:
+            return None
+        j = json_loads(response.content)
+        if self.metadata_cache and j is not None:
+            self.metadata_cache.put(kind, j, key)
+        return j
+
     def get_device_list_usage(
         self,
         deviceGids: Union[str, "list[str]"],
@@ -111,60 +221,139 @@ class PyEmVue(object):
         max_retry_attempts: int = 5,
         initial_retry_delay: float = 2.0,
         max_retry_delay: float = 30.0,
-    ) -> "dict[int, VueUsageDevice]":
-        """Returns a nested dictionary of VueUsageDevice and VueDeviceChannelUsage with the total usage of the devices over the specified scale. Note that you may need to scale this to get a rate (1MIN in kw = 60*result)"""
+        max_batch_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> DeviceListUsage:
+        """Returns a nested dictionary of VueUsageDevice and VueDeviceChannelUsage with the total usage of the devices over the specified scale. Note that you may need to scale this to get a rate (1MIN in kw = 60*result)
+        The max_retry_* arguments are ignored if a retry_policy was given to the constructor.
+        Devices are requested in batches of at most max_batch_size, and small enough to keep the url within
+        DEVICE_LIST_USAGE_MAX_URL_LENGTH, up to max_workers batches at a time. Each batch is retried on its own.
+        Retries only request the devices that had channels without usage, any still missing are listed in missing_channels of the result.
+        Devices the response leaves out entirely are not retried and are listed in missing_devices."""
         if not instant:
             instant = datetime.datetime.now(datetime.timezone.utc)
-        gids = deviceGids
-        if isinstance(deviceGids, list):
-            gids = "+".join(map(str, deviceGids))
-
-        url = API_DEVICES_USAGE.format(
-            deviceGids=gids, instant=_format_time(instant), scale=scale, unit=unit
+        policy = self.retry_policy or RetryPolicy(
+            max_attempts=max_retry_attempts,
+            initial_delay=max(initial_retry_delay, 0.5),
+            max_delay=max_retry_delay,
+            jitter=0,
         )
+        batches = _batch_device_gids(deviceGids, instant, scale, unit, max_batch_size)
+        if len(batches) == 1:
+            return self._get_device_list_usage_batch(
+                batches[0], instant, scale, unit, policy
+            )
+
+        devices = DeviceListUsage()
+        workers = max(min(max_workers or self.pool_maxsize, len(batches)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_devices in executor.map(
+                lambda gids: self._get_device_list_usage_batch(
+                    gids, instant, scale, unit, policy
+                ),
+                batches,
+            ):
+                devices.update(batch_devices)
+                devices.missing_channels.extend(batch_devices.missing_channels)
+                devices.missing_devices.extend(batch_devices.missing_devices)
+        return devices
+
+    def _get_device_list_usage_batch(
+        self,
+        deviceGids: "list[str]",
+        instant: datetime.datetime,
+        scale: str,
+        unit: str,
+        policy: RetryPolicy,
+    ) -> DeviceListUsage:
+        state = policy.start()
+        # with a client wide retry policy its deadline covers the retries made by auth as well
+        auth_retry_state = state if self.retry_policy else None
         attempts = 0
-        update_failed = True
-        max_retry_attempts = max(max_retry_attempts, 1)
-        initial_retry_delay = max(initial_retry_delay, 0.5)
-        max_retry_delay = max(max_retry_delay, 0)
-        devices: dict[int, VueUsageDevice] = {}
-
-        while attempts < max_retry_attempts and update_failed:
-            update_failed = False # reset the flag, if we fail we'll set it again
-            if attempts > 0:
-                # if we're retrying, wait a bit before trying again using an exponential backoff
-                delay = min(
-                    initial_retry_delay * (2 ** (attempts - 1)),
-                    max_retry_delay,
-                )
-                time.sleep(delay)
+        pending = deviceGids
+        devices = DeviceListUsage()
+        incomplete: dict[int, VueUsageDevice] = {}
+
+        while True:
             attempts += 1
-            response = self.auth.request("get", url)
-            if response.status_code == 200 and response.text:
-                j = response.json()
-                if "deviceListUsages" in j and "devices" in j["deviceListUsages"]:
-                    timestamp = parse(j["deviceListUsages"]["instant"])
-                    for device in j["deviceListUsages"]["devices"]:
-                        populated = VueUsageDevice(
-                            timestamp=timestamp
-                        ).from_json_dictionary(device)
-                        # data is missing if any usage is None for any channels. In that case we retry the request and merge results.
-                        data_missing = any(channel_usage.usage is None for channel_usage in populated.channels.values())
-                        update_failed = update_failed or data_missing
-                        if not data_missing or attempts >= max_retry_attempts:
-                            # only overwrite the device data if we have all the data or we've run out of retries
-                            devices[populated.device_gid] = populated
-                else:
-                    update_failed = True
-            else:
-                update_failed = True
-
-        # if we still haven't fully succeeded, return the data we did manage to get
+            url = _device_list_usage_url(pending, instant, scale, unit)
+            response = self.auth.request("get", url, retry_state=auth_retry_state)
+            pending = _record_device_list_usage(
+                response, pending, devices, incomplete, self.lazy_nested_devices
+            )
+            delay = _device_list_usage_retry_delay(
+                pending, state, attempts, self.auth.circuit_breaker
+            )
+            if delay is None:
+                break
+            time.sleep(delay)
 
+        _add_incomplete_device_list_usage(devices, incomplete)
         if response:
             response.raise_for_status()
         return devices
 
+    def get_device_list_usage_frame(
+        self,
+        deviceGids: Union[str, "list[str]"],
+        instant: Optional[datetime.datetime],
+        scale=Scale.SECOND.value,
+        unit=Unit.KWH.value,
+        max_batch_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> "UsageFrame":
+        """Like get_device_list_usage but returns a UsageFrame built straight from the response json.
+        Requests are not repeated for missing usage, it is NaN in the frame."""
+        # imported here since the usage_frame module depends on this one
+        from pyemvue.usage_frame import UsageFrame
+
+        if not instant:
+            instant = datetime.datetime.now(datetime.timezone.utc)
+        batches = _batch_device_gids(deviceGids, instant, scale, unit, max_batch_size)
+
+        def fetch(gids: "list[str]") -> "dict[str, Any]":
+            url = _device_list_usage_url(gids, instant, scale, unit)
+            retry_state = self.retry_policy.start() if self.retry_policy else None
+            response = self.auth.request("get", url, retry_state=retry_state)
+            response.raise_for_status()
+            return json_loads(response.content) if response.content else {}
+
+        if len(batches) == 1:
+            return UsageFrame.from_json(fetch(batches[0]))
+        workers = max(min(max_workers or self.pool_maxsize, len(batches)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(fetch, batches))
+        # combine the batches into a single response
+        merged: dict[str, Any] = {}
+        devices = []
+        for j in responses:
+            usages = (j or {}).get("deviceListUsages") or {}
+            merged = merged or dict(usages)
+            devices.extend(usages.get("devices") or [])
+        merged["devices"] = devices
+        return UsageFrame.from_json({"deviceListUsages": merged})
+
+    def iter_usage(
+        self,
+        device_gids: Union[str, "list[str]"],
+        scale=Scale.MINUTE.value,
+        unit=Unit.KWH.value,
+        offset: float = 0.0,
+        max_retry_attempts: int = 2,
+        on_error: Optional[Callable[[datetime.datetime, Exception], None]] = None,
+    ) -> "Iterator[UsageSample]":
+        """Poll the usage of the devices at every boundary of the scale, see UsagePoller, and yield a UsageSample for
+        every channel, including the channels of nested devices. Polling only continues as the samples are consumed,
+        instants that pass while the consumer is busy are skipped rather than buffered."""
+        # imported here since the poller module depends on this one
+        from pyemvue.poller import UsagePoller, iter_channel_usage
+
+        poller = UsagePoller(
+            self, device_gids, scale, unit, offset, max_retry_attempts, on_error
+        )
+        for instant, usage in poller:
+            yield from iter_channel_usage(usage, instant)
+
     def get_chart_usage(
         self,
         channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
@@ -172,8 +361,11 @@ class PyEmVue(object):
         end: Optional[datetime.datetime] = None,
         scale=Scale.SECOND.value,
         unit=Unit.KWH.value,
+        max_workers: Optional[int] = None,
     ) -> "tuple[list[float], Optional[datetime.datetime]]":
-        """Gets the usage over a given time period and the start of the measurement period. Note that you may need to scale this to get a rate (1MIN in kw = 60*result)"""
+        """Gets the usage over a given time period and the start of the measurement period. Note that you may need to scale this to get a rate (1MIN in kw = 60*result)
+        Ranges longer than CHART_USAGE_MAX_WINDOWS allows for the scale are fetched in chunks, up to max_workers at a time, and stitched together.
+        Points missing from the stitched series are None."""
         if channel.channel_num in ["MainsFromGrid", "MainsToGrid"]:
             # This is not populated for the special Mains data as of right now
             return [], start
@@ -181,33 +373,136 @@ class PyEmVue(object):
             start = datetime.datetime.now(datetime.timezone.utc)
         if not end:
             end = datetime.datetime.now(datetime.timezone.utc)
-        url = API_CHART_USAGE.format(
-            deviceGid=channel.device_gid,
-            channel=channel.channel_num,
-            start=_format_time(start),
-            end=_format_time(end),
-            scale=scale,
-            unit=unit,
+        if self.chart_usage_cache and scale in SCALE_STEPS:
+            return self._get_cached_chart_usage(
+                channel, start, end, scale, unit, max_workers
+            )
+        return self._fetch_chart_usage(channel, start, end, scale, unit, max_workers)
+
+    def _fetch_chart_usage(
+        self,
+        channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        scale: str,
+        unit: str,
+        max_workers: Optional[int],
+    ) -> "tuple[list[float], Optional[datetime.datetime]]":
+        windows = _split_chart_range(start, end, scale)
+        if len(windows) > 1:
+            workers = max(min(max_workers or self.pool_maxsize, len(windows)), 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                chunks = list(
+                    executor.map(
+                        lambda window: self._get_chart_usage_window(
+                            channel, window[0], window[1], scale, unit
+                        ),
+                        windows,
+                    )
+                )
+            return _stitch_chart_usage(chunks, windows, scale)
+        return self._get_chart_usage_window(channel, start, end, scale, unit)
+
+    def _get_cached_chart_usage(
+        self,
+        channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        scale: str,
+        unit: str,
+        max_workers: Optional[int],
+    ) -> "tuple[list[float], Optional[datetime.datetime]]":
+        """Serve the range from the chart usage cache, fetching only the points that aren't cached or are still open."""
+        cache = self.chart_usage_cache
+        step = int(SCALE_STEPS[scale].total_seconds())
+        first = int(_as_utc(start).timestamp()) // step * step
+        last = max(-(-int(_as_utc(end).timestamp()) // step) * step - step, first)
+        points: dict[int, Optional[float]] = dict(
+            cache.get(channel.device_gid, channel.channel_num, scale, unit, first, last)
         )
+        max_span = int(CHART_USAGE_MAX_WINDOWS[scale].total_seconds())
+        for run_first, run_last in _coalesce_ranges(
+            missing_ranges(points, first, last, step), step, max_span
+        ):
+            usage, instant = self._fetch_chart_usage(
+                channel,
+                datetime.datetime.fromtimestamp(run_first, datetime.timezone.utc),
+                datetime.datetime.fromtimestamp(run_last + step, datetime.timezone.utc),
+                scale,
+                unit,
+                max_workers,
+            )
+            if not instant:
+                continue
+            offset = int(_as_utc(instant).timestamp()) // step * step
+            fetched = {offset + i * step: value for i, value in enumerate(usage)}
+            cache.put(
+                channel.device_gid, channel.channel_num, scale, unit, step, fetched
+            )
+            for bucket, value in fetched.items():
+                if first <= bucket <= last and points.get(bucket) is None:
+                    points[bucket] = value
+        return [
+            points.get(bucket) for bucket in range(first, last + step, step)
+        ], datetime.datetime.fromtimestamp(first, datetime.timezone.utc)
+
+    def _get_chart_usage_window(
+        self,
+        channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        scale: str,
+        unit: str,
+    ) -> "tuple[list[float], Optional[datetime.datetime]]":
+        url = _chart_usage_url(channel, start, end, scale, unit)
         response = self.auth.request("get", url)
         response.raise_for_status()
-        usage: list[float] = []
-        instant = start
-        if response.text:
-            j = response.json()
-            if "firstUsageInstant" in j:
-                instant = parse(j["firstUsageInstant"])
-            if "usageList" in j:
-                usage = j["usageList"]
-        return usage, instant
+        if response.content:
+            return _parse_chart_usage(json_loads(response.content), start)
+        return [], start
+
+    def get_chart_usage_many(
+        self,
+        channels: "list[Union[VueDeviceChannel, VueDeviceChannelUsage]]",
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        scale=Scale.SECOND.value,
+        unit=Unit.KWH.value,
+        max_workers: Optional[int] = None,
+    ) -> "tuple[dict[tuple[int, str], tuple[list[float], Optional[datetime.datetime]]], dict[tuple[int, str], Exception]]":
+        """Gets the usage of several channels in parallel, see get_chart_usage. Returns a tuple of the results and the errors, both keyed by (device_gid, channel_num).
+        max_workers defaults to pool_maxsize so that every request can use a pooled connection."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        start = start or now
+        end = end or now
+        results: dict[tuple[int, str], tuple[list[float], Optional[datetime.datetime]]] = {}
+        errors: dict[tuple[int, str], Exception] = {}
+        if not channels:
+            return results, errors
+
+        workers = max(min(max_workers or self.pool_maxsize, len(channels)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    self.get_chart_usage, channel, start, end, scale, unit
+                ): (channel.device_gid, channel.channel_num)
+                for channel in channels
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as ex:
+                    errors[key] = ex
+        return results, errors
 
     def get_outlets(self) -> "list[OutletDevice]":
         """Return a list of outlets linked to the account. Deprecated, use get_devices_status instead."""
         response = self.auth.request("get", API_GET_STATUS)
         response.raise_for_status()
         outlets = []
-        if response.text:
-            j = response.json()
+        if response.content:
+            j = json_loads(response.content)
             if j and "outlets" in j and j["outlets"]:
                 for raw_outlet in j["outlets"]:
                     outlets.append(OutletDevice().from_json_dictionary(raw_outlet))
@@ -222,8 +517,10 @@ class PyEmVue(object):
             outlet.outlet_on = on
 
         response = self.auth.request("put", API_OUTLET, json=outlet.as_dictionary())
+        if self.metadata_cache:
+            self.metadata_cache.invalidate(DEVICES)
         response.raise_for_status()
-        outlet.from_json_dictionary(response.json())
+        outlet.from_json_dictionary(json_loads(response.content))
         return outlet
 
     def get_chargers(self) -> "list[ChargerDevice]":
@@ -231,8 +528,8 @@ class PyEmVue(object):
         response = self.auth.request("get", API_GET_STATUS)
         response.raise_for_status()
         chargers = []
-        if response.text:
-            j = response.json()
+        if response.content:
+            j = json_loads(response.content)
             if j and "evChargers" in j and j["evChargers"]:
                 for raw_charger in j["evChargers"]:
                     chargers.append(ChargerDevice().from_json_dictionary(raw_charger))
@@ -251,53 +548,32 @@ class PyEmVue(object):
             charger.charging_rate = charge_rate
 
         response = self.auth.request("put", API_CHARGER, json=charger.as_dictionary())
+        if self.metadata_cache:
+            self.metadata_cache.invalidate(DEVICES)
         response.raise_for_status()
-        charger.from_json_dictionary(response.json())
+        charger.from_json_dictionary(json_loads(response.content))
         return charger
 
     def get_devices_status(
-        self, device_list: Optional["list[VueDevice]"] = None
+        self, device_list: Optional[Union["list[VueDevice]", DeviceRegistry]] = None
     ) -> "tuple[list[OutletDevice], list[ChargerDevice]]":
-        """Gets the list of outlets and chargers. If device list is provided, updates the connected status on each device."""
+        """Gets the list of outlets and chargers. If device list is provided, updates the connected status on each device.
+        A DeviceRegistry also has the outlets and chargers of its devices updated."""
         response = self.auth.request("get", API_GET_STATUS)
         response.raise_for_status()
-        chargers: list[ChargerDevice] = []
-        outlets: list[OutletDevice] = []
-        if response.text:
-            j = response.json()
-            if j and "evChargers" in j and j["evChargers"]:
-                for raw_charger in j["evChargers"]:
-                    chargers.append(ChargerDevice().from_json_dictionary(raw_charger))
-            if j and "outlets" in j and j["outlets"]:
-                for raw_outlet in j["outlets"]:
-                    outlets.append(OutletDevice().from_json_dictionary(raw_outlet))
-            if device_list and j and "devicesConnected" in j and j["devicesConnected"]:
-                for raw_device_data in j["devicesConnected"]:
-                    if (
-                        raw_device_data
-                        and "deviceGid" in raw_device_data
-                        and raw_device_data["deviceGid"]
-                    ):
-                        for device in device_list:
-                            if device.device_gid == raw_device_data["deviceGid"]:
-                                device.connected = raw_device_data["connected"]
-                                device.offline_since = raw_device_data["offlineSince"]
-                                break
-
-        return (outlets, chargers)
+        if response.content:
+            return _parse_devices_status(json_loads(response.content), device_list)
+        return ([], [])
 
     def get_channel_types(self) -> "list[ChannelType]":
         """Gets the list of channel types"""
-        response = self.auth.request("get", API_CHANNEL_TYPES)
-        response.raise_for_status()
+        j = self._get_metadata(CHANNEL_TYPES, API_CHANNEL_TYPES)
         channel_types: list[ChannelType] = []
-        if response.text:
-            j = response.json()
-            if j:
-                for raw_channel_type in j:
-                    channel_types.append(
-                        ChannelType().from_json_dictionary(raw_channel_type)
-                    )
+        if j:
+            for raw_channel_type in j:
+                channel_types.append(
+                    ChannelType().from_json_dictionary(raw_channel_type)
+                )
         return channel_types
 
     def get_vehicles(self) -> "list[Vehicle]":
@@ -305,8 +581,8 @@ class PyEmVue(object):
         response = self.auth.request("get", API_VEHICLES)
         response.raise_for_status()
         vehicles: list[Vehicle] = []
-        if response.text:
-            j = response.json()
+        if response.content:
+            j = json_loads(response.content)
             for veh in j:
                 vehicles.append(Vehicle().from_json_dictionary(veh))
         return vehicles
@@ -316,8 +592,8 @@ class PyEmVue(object):
         url = API_VEHICLE_STATUS.format(vehicleGid=vehicle_gid)
         response = self.auth.request("get", url)
         response.raise_for_status()
-        if response.text:
-            j = response.json()
+        if response.content:
+            j = json_loads(response.content)
             return VehicleStatus().from_json_dictionary(j)
         return None
 
@@ -329,41 +605,46 @@ class PyEmVue(object):
         access_token: Optional[str] = None,
         refresh_token: Optional[str] = None,
         token_storage_file: Optional[str] = None,
+        token_store: Optional[TokenStore] = None,
     ) -> bool:
         """Authenticates the current user using access tokens if provided or username/password if no tokens available.
         Provide a path for storing the token data that can be used to reauthenticate without providing the password.
         Tokens stored in the file are updated when they expire.
+        Alternatively provide a token_store to control where the tokens are kept. Processes sharing a store
+        pick up each other's refreshed tokens instead of all refreshing them.
         """
-        # try to pull data out of the token storage file if present
-        self.username = username.lower() if username else None
-        if token_storage_file:
-            self.token_storage_file = token_storage_file
-        if not password and not id_token and token_storage_file:
-            with open(token_storage_file, "r") as f:
-                data = json.load(f)
-                if "id_token" in data:
-                    id_token = data["id_token"]
-                if "access_token" in data:
-                    access_token = data["access_token"]
-                if "refresh_token" in data:
-                    refresh_token = data["refresh_token"]
-                if "username" in data:
-                    self.username = data["username"]
-                if "password" in data:
-                    password = data["password"]
+        password, tokens, jwks_cache_file = _prepare_login(
+            self,
+            username,
+            password,
+            id_token,
+            access_token,
+            refresh_token,
+            token_storage_file,
+            token_store,
+        )
 
+        self.close()
         self.auth = Auth(
             host=API_ROOT,
             username=self.username,
             password=password,
             connect_timeout=self.connect_timeout,
             read_timeout=self.read_timeout,
-            tokens={
-                "access_token": access_token,
-                "id_token": id_token,
-                "refresh_token": refresh_token,
-            },
+            tokens=tokens,
             token_updater=self._store_tokens,
+            token_store=self.token_store,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            keep_alive=self.keep_alive,
+            background_refresh=self.background_token_refresh,
+            refresh_margin=self.token_refresh_margin,
+            jwks_cache_file=jwks_cache_file,
+            jwks_cache_ttl=self.jwks_cache_ttl,
         )
 
         try:
@@ -381,27 +662,363 @@ class PyEmVue(object):
         self, host: str, username: Optional[str] = None, password: Optional[str] = None
     ) -> bool:
         self.username = username.lower() if username else None
-        self.auth = SimulatedAuth(host=host, username=self.username, password=password)
+        self.close()
+        self.auth = SimulatedAuth(
+            host=host,
+            username=self.username,
+            password=password,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            keep_alive=self.keep_alive,
+        )
         self.customer = self.get_customer_details()
         return self.customer is not None
 
     def _store_tokens(self, tokens: "dict[str, Any]"):
-        if not self.token_storage_file:
+        if not self.token_store:
             return
         if self.username:
             tokens["username"] = self.username
-        with open(self.token_storage_file, "w") as f:
-            json.dump(tokens, f, indent=2)
+        self.token_store.save(tokens)
+
+
+def _get_maintenance_message(
+    session: Optional[requests.Session], timeout: "tuple[float, float]"
+) -> Optional[str]:
+    response = (session or requests).get(API_MAINTENANCE, timeout=timeout)
+    if response.status_code != 200:
+        # the file is not accessible outside of maintenance
+        return None
+    if response.content:
+        j = json_loads(response.content)
+        if "msg" in j:
+            return j["msg"]
+    return None
+
+
+def _prepare_login(
+    client: Any,
+    username: Optional[str],
+    password: Optional[str],
+    id_token: Optional[str],
+    access_token: Optional[str],
+    refresh_token: Optional[str],
+    token_storage_file: Optional[str],
+    token_store: Optional[TokenStore],
+) -> "tuple[Optional[str], dict[str, Optional[str]], Optional[str]]":
+    """The login steps shared by PyEmVue and AsyncPyEmVue before the auth is created. Sets the username,
+    token_storage_file and token_store of the client, fills in the credentials from the token store if none were given
+    and returns the password, the tokens and the jwks_cache_file to create the auth with."""
+    # try to pull data out of the token storage file if present
+    client.username = username.lower() if username else None
+    if token_storage_file:
+        client.token_storage_file = token_storage_file
+        if not token_store:
+            token_store = FileTokenStore(token_storage_file)
+    if token_store:
+        client.token_store = token_store
+    if not password and not id_token and token_store:
+        data = token_store.load() or {}
+        if "id_token" in data:
+            id_token = data["id_token"]
+        if "access_token" in data:
+            access_token = data["access_token"]
+        if "refresh_token" in data:
+            refresh_token = data["refresh_token"]
+        if "username" in data:
+            client.username = data["username"]
+        if "password" in data:
+            password = data["password"]
+
+    jwks_cache_file = client.jwks_cache_file
+    if not jwks_cache_file and client.token_storage_file:
+        jwks_cache_file = os.path.splitext(client.token_storage_file)[0] + ".jwks.json"
+
+    tokens = {
+        "access_token": access_token,
+        "id_token": id_token,
+        "refresh_token": refresh_token,
+    }
+    return password, tokens, jwks_cache_file
+
+
+def _device_list_usage_url(
+    deviceGids: Union[str, "list[str]"],
+    instant: Optional[datetime.datetime],
+    scale: str,
+    unit: str,
+) -> str:
+    if not instant:
+        instant = datetime.datetime.now(datetime.timezone.utc)
+    gids = deviceGids
+    if isinstance(deviceGids, list):
+        gids = "+".join(map(str, deviceGids))
+    return API_DEVICES_USAGE.format(
+        deviceGids=gids, instant=_format_time(instant), scale=scale, unit=unit
+    )
+
+
+def _batch_device_gids(
+    deviceGids: Union[str, "list[str]"],
+    instant: datetime.datetime,
+    scale: str,
+    unit: str,
+    max_batch_size: Optional[int],
+) -> "list[list[str]]":
+    """Split the gids into batches whose getDeviceListUsages url fits in DEVICE_LIST_USAGE_MAX_URL_LENGTH."""
+    if isinstance(deviceGids, list):
+        gids = [str(gid) for gid in deviceGids]
+    else:
+        gids = str(deviceGids).split("+")
+    available = DEVICE_LIST_USAGE_MAX_URL_LENGTH - len(
+        _device_list_usage_url([], instant, scale, unit)
+    )
+    batches: list[list[str]] = [[]]
+    length = 0
+    for gid in gids:
+        batch = batches[-1]
+        if batch and (
+            length + 1 + len(gid) > available
+            or (max_batch_size and len(batch) >= max_batch_size)
+        ):
+            batch = []
+            batches.append(batch)
+            length = 0
+        length += len(gid) + (1 if batch else 0)
+        batch.append(gid)
+    return batches
+
+
+def _chart_usage_url(
+    channel: Union[VueDeviceChannel, VueDeviceChannelUsage],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    scale: str,
+    unit: str,
+) -> str:
+    return API_CHART_USAGE.format(
+        deviceGid=channel.device_gid,
+        channel=channel.channel_num,
+        start=_format_time(start),
+        end=_format_time(end),
+        scale=scale,
+        unit=unit,
+    )
+
+
+def _split_chart_range(
+    start: datetime.datetime, end: datetime.datetime, scale: str
+) -> "list[tuple[datetime.datetime, datetime.datetime]]":
+    """Split the range into windows no longer than the maximum for the scale. Windows share their boundary instants."""
+    window = CHART_USAGE_MAX_WINDOWS.get(scale)
+    if not window or _as_utc(end) - _as_utc(start) <= window:
+        return [(start, end)]
+    start = _as_utc(start)
+    end = _as_utc(end)
+    windows = []
+    window_start = start
+    while window_start < end:
+        window_end = min(window_start + window, end)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def _stitch_chart_usage(
+    chunks: "list[tuple[list[float], Optional[datetime.datetime]]]",
+    windows: "list[tuple[datetime.datetime, datetime.datetime]]",
+    scale: str,
+) -> "tuple[list[float], Optional[datetime.datetime]]":
+    """Merge the usage of consecutive windows into one series, placing each point by its instant.
+    Points reported by more than one window are only kept once and gaps, including windows that came back
+    empty, are filled with None."""
+    step = SCALE_STEPS[scale]
+    first_instant: Optional[datetime.datetime] = None
+    points: dict[int, float] = {}
+    for (usage, instant), (window_start, _) in zip(chunks, windows):
+        if not usage:
+            # an empty window may report no instant at all, so it must not anchor the series
+            continue
+        instant = _as_utc(instant or window_start)
+        if first_instant is None:
+            first_instant = instant
+        offset = round((instant - first_instant) / step)
+        for i, value in enumerate(usage):
+            if value is not None or offset + i not in points:
+                points[offset + i] = value
+    if not points:
+        return [], first_instant or windows[0][0]
+    first = min(points)
+    if first < 0:
+        first_instant = first_instant + first * step
+    return [points.get(i) for i in range(first, max(points) + 1)], first_instant
+
+
+def _coalesce_ranges(
+    ranges: "list[tuple[int, int]]", step: int, max_span: int
+) -> "list[tuple[int, int]]":
+    """Merge ranges separated by at most CHART_CACHE_MAX_REFETCH cached points, as long as the merged range
+    is no longer than max_span, so that scattered gaps are fetched with a few requests rather than one each."""
+    merged: list[tuple[int, int]] = []
+    for first, last in ranges:
+        if (
+            merged
+            and first - merged[-1][1] <= (CHART_CACHE_MAX_REFETCH + 1) * step
+            and last - merged[-1][0] <= max_span
+        ):
+            merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _as_utc(time: datetime.datetime) -> datetime.datetime:
+    """Make the time aware, assuming unaware times are already utc"""
+    if time.tzinfo and time.tzinfo.utcoffset(time) is not None:
+        return time.astimezone(datetime.timezone.utc)
+    return time.replace(tzinfo=datetime.timezone.utc)
+
+
+def _parse_devices(j: "dict[str, Any]") -> "list[VueDevice]":
+    """Parse the devices, including any sub devices, out of a customers/devices response."""
+    devices: list[VueDevice] = []
+    if "devices" in j:
+        for dev in j["devices"]:
+            devices.append(VueDevice().from_json_dictionary(dev))
+            if "devices" in dev:
+                for subdev in dev["devices"]:
+                    devices.append(VueDevice().from_json_dictionary(subdev))
+    return devices
+
+
+def _parse_device_list_usage(
+    j: "dict[str, Any]", lazy_nested: bool = False
+) -> Optional["list[VueUsageDevice]"]:
+    """Parse a getDeviceListUsages response, returns None if the response has no device data."""
+    if "deviceListUsages" in j and "devices" in j["deviceListUsages"]:
+        timestamp = parse_timestamp(j["deviceListUsages"]["instant"])
+        return [
+            VueUsageDevice(timestamp=timestamp).from_json_dictionary(
+                device, lazy_nested
+            )
+            for device in j["deviceListUsages"]["devices"]
+        ]
+    return None
+
+
+def _record_device_list_usage(
+    response: Any,
+    pending: "list[str]",
+    devices: DeviceListUsage,
+    incomplete: "dict[int, VueUsageDevice]",
+    lazy_nested: bool = False,
+) -> "list[str]":
+    """Record the devices of a getDeviceListUsages response for the pending gids and return the gids to request again.
+    Complete devices go in devices and devices with channels lacking usage in incomplete. Devices left out of the
+    response aren't requested again, they are listed in missing_devices instead. A failed response retries them all.
+    """
+    if response.status_code != 200 or not response.content:
+        return pending
+    usage_devices = _parse_device_list_usage(json_loads(response.content), lazy_nested)
+    if usage_devices is None:
+        return pending
+    returned = {str(populated.device_gid) for populated in usage_devices}
+    devices.missing_devices.extend(int(gid) for gid in pending if gid not in returned)
+    retry = []
+    for populated in usage_devices:
+        # data is missing if any usage is None for any channels. In that case only those devices are requested again.
+        if any(
+            channel_usage.usage is None
+            for channel_usage in populated.channels.values()
+        ):
+            incomplete[populated.device_gid] = populated
+            retry.append(str(populated.device_gid))
+        else:
+            devices[populated.device_gid] = populated
+            incomplete.pop(populated.device_gid, None)
+    return retry
+
+
+def _device_list_usage_retry_delay(
+    retry: "list[str]",
+    state: RetryState,
+    attempts: int,
+    breaker: Optional[CircuitBreaker],
+) -> Optional[float]:
+    """How long to wait before requesting the retry gids again, or None to stop."""
+    if not retry:
+        return None
+    # if we're retrying, wait a bit before trying again using an exponential backoff
+    delay = state.delay(attempts)
+    if not state.can_retry(attempts, delay):
+        return None
+    if breaker and not breaker.closed:
+        # the API looks to be down, don't wait around to retry
+        return None
+    return delay
+
+
+def _add_incomplete_device_list_usage(
+    devices: DeviceListUsage, incomplete: "dict[int, VueUsageDevice]"
+):
+    """Return the data we did manage to get for the devices that never fully succeeded, listing their missing channels."""
+    for gid, populated in incomplete.items():
+        devices[gid] = populated
+        devices.missing_channels.extend(
+            (gid, channel_num)
+            for channel_num, channel_usage in populated.channels.items()
+            if channel_usage.usage is None
+        )
+
+
+def _parse_chart_usage(
+    j: "dict[str, Any]", start: Optional[datetime.datetime]
+) -> "tuple[list[float], Optional[datetime.datetime]]":
+    usage: list[float] = []
+    instant = start
+    if "firstUsageInstant" in j:
+        instant = parse_timestamp(j["firstUsageInstant"])
+    if "usageList" in j:
+        usage = j["usageList"]
+    return usage, instant
+
+
+def _parse_devices_status(
+    j: "dict[str, Any]",
+    device_list: Optional[Union["list[VueDevice]", DeviceRegistry]] = None,
+) -> "tuple[list[OutletDevice], list[ChargerDevice]]":
+    """Parse the outlets and chargers out of a devices status response, updating the connected status of any provided devices.
+    A DeviceRegistry also has the outlets and chargers of its devices updated."""
+    chargers: list[ChargerDevice] = []
+    outlets: list[OutletDevice] = []
+    if j and "evChargers" in j and j["evChargers"]:
+        for raw_charger in j["evChargers"]:
+            chargers.append(ChargerDevice().from_json_dictionary(raw_charger))
+    if j and "outlets" in j and j["outlets"]:
+        for raw_outlet in j["outlets"]:
+            outlets.append(OutletDevice().from_json_dictionary(raw_outlet))
+    if isinstance(device_list, DeviceRegistry):
+        device_list.merge_status(
+            (j and j.get("devicesConnected")) or [], outlets, chargers
+        )
+    elif device_list and j and "devicesConnected" in j and j["devicesConnected"]:
+        devices: dict[int, VueDevice] = {}
+        for device in device_list:
+            devices.setdefault(device.device_gid, device)
+        for raw_device_data in j["devicesConnected"]:
+            if (
+                raw_device_data
+                and "deviceGid" in raw_device_data
+                and raw_device_data["deviceGid"]
+            ):
+                device = devices.get(raw_device_data["deviceGid"])
+                if device:
+                    device.connected = raw_device_data["connected"]
+                    device.offline_since = raw_device_data["offlineSince"]
+    return (outlets, chargers)
 
 
 def _format_time(time: datetime.datetime) -> str:
     """Convert time to utc, then format"""
-    # check if aware
-    if time.tzinfo and time.tzinfo.utcoffset(time) is not None:
-        # aware, convert to utc
-        time = time.astimezone(datetime.timezone.utc)
-    else:
-        # unaware, assume it's already utc
-        time = time.replace(tzinfo=datetime.timezone.utc)
-    time = time.replace(tzinfo=None)  # make it unaware
-    return time.isoformat() + "Z"
+    return format_timestamp(time)
@@ -0,0 +1,137 @@
+import datetime
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Requests per second allowed for specific endpoints on top of the overall rate.
+# Chart usage queries are far more expensive for the server than the other calls.
+DEFAULT_ENDPOINT_RATES = {
+    "getChartUsage": 2.0,
+    "getDeviceListUsages": 5.0,
+}
+
+
+class TokenBucket(object):
+    """A token bucket that hands out slots at rate per second with bursts of up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.max_rate = max(rate, 0.001)
+        self.rate = self.max_rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take a slot and return how many seconds the caller must wait before using it."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def throttle(self, now: float, factor: float, retry_after: Optional[float]):
+        """Reduce the rate after the server reported throttling and pause until retry_after has passed."""
+        self.rate = max(self.rate * factor, self.max_rate * 0.05)
+        self.tokens = min(self.tokens, 0)
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def recover(self, factor: float):
+        """Raise the rate back towards the configured rate after a successful request."""
+        self.rate = min(self.rate * factor, self.max_rate)
+
+
+class RateLimiter(object):
+    """Client side rate limiting shared by every request made through an Auth.
+    Each request must fit in both the overall budget and the budget for its endpoint, if it has one.
+    Budgets shrink when the server responds with 429 and recover gradually as requests succeed."""
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: float = 10,
+        endpoint_rates: Optional["dict[str, float]"] = None,
+        throttle_factor: float = 0.5,
+        recovery_factor: float = 1.05,
+    ):
+        """rate is the overall number of requests per second and burst how many may be made back to back.
+        endpoint_rates maps an endpoint key (see endpoint_key) to its own requests per second, defaults to DEFAULT_ENDPOINT_RATES.
+        """
+        if endpoint_rates is None:
+            endpoint_rates = DEFAULT_ENDPOINT_RATES
+        self.throttle_factor = min(max(throttle_factor, 0.01), 1)
+        self.recovery_factor = max(recovery_factor, 1)
+        self._overall = TokenBucket(rate, burst)
+        self._endpoints = {
+            key: TokenBucket(endpoint_rate, max(endpoint_rate, 1))
+            for key, endpoint_rate in endpoint_rates.items()
+        }
+        self._lock = threading.Lock()
+
+    def reserve(self, path: str) -> float:
+        """Take a slot for a request to path and return how many seconds to wait before making it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._overall.reserve(now)
+            bucket = self._endpoints.get(endpoint_key(path))
+            if bucket:
+                wait = max(wait, bucket.reserve(now))
+            return wait
+
+    def acquire(self, path: str):
+        """Block until a request to path is allowed."""
+        wait = self.reserve(path)
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self, path: str, retry_after: Optional[float] = None):
+        """Record that the server throttled a request to path."""
+        with self._lock:
+            now = time.monotonic()
+            self._overall.throttle(now, self.throttle_factor, retry_after)
+            bucket = self._endpoints.get(endpoint_key(path))
+            if bucket:
+                bucket.throttle(now, self.throttle_factor, retry_after)
+
+    def succeeded(self, path: str):
+        """Record that a request to path was not throttled."""
+        with self._lock:
+            self._overall.recover(self.recovery_factor)
+            bucket = self._endpoints.get(endpoint_key(path))
+            if bucket:
+                bucket.recover(self.recovery_factor)
+
+
+def endpoint_key(path: str) -> str:
+    """The key used for per endpoint budgets: the apiMethod for AppAPI calls, otherwise the path with ids replaced by *.
+    For example getChartUsage or devices/*/locationProperties."""
+    path, _, query = path.partition("?")
+    if path == "AppAPI":
+        match = re.search(r"(?:^|&)apiMethod=([^&]*)", query)
+        if match:
+            return match.group(1)
+    return "/".join("*" if part.isdigit() else part for part in path.split("/"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(
+        (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0
+    )
@@ -0,0 +1,79 @@
+import random
+import time
+from typing import Optional
+
+
+class RetryDeadlineExceeded(TimeoutError):
+    """Raised when an operation runs out of time before it could make a request."""
+
+
+class RetryPolicy(object):
+    """How failed requests are retried: the number of attempts, exponential backoff with jitter and an
+    optional deadline in seconds that bounds the whole operation, including every layer of retries and sleeps.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        initial_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: float = 0.1,
+        deadline: Optional[float] = None,
+    ):
+        """jitter randomly varies each delay by up to that fraction of it."""
+        self.max_attempts = max(max_attempts, 1)
+        self.initial_delay = max(initial_delay, 0)
+        self.max_delay = max(max_delay, 0)
+        self.jitter = min(max(jitter, 0), 1)
+        self.deadline = deadline
+
+    def start(self) -> "RetryState":
+        """Start tracking a new operation."""
+        return RetryState(self)
+
+
+class RetryState(object):
+    """The deadline of a single operation, shared by every layer that retries on its behalf."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.deadline_at = (
+            time.monotonic() + policy.deadline if policy.deadline is not None else None
+        )
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None if there is no deadline."""
+        if self.deadline_at is None:
+            return None
+        return max(self.deadline_at - time.monotonic(), 0)
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def delay(self, attempts: int, policy: Optional[RetryPolicy] = None) -> float:
+        """The backoff before the next attempt after the given number of attempts."""
+        policy = policy or self.policy
+        delay = min(policy.initial_delay * (2 ** (attempts - 1)), policy.max_delay)
+        if policy.jitter:
+            delay *= 1 + random.uniform(-policy.jitter, policy.jitter)
+        return max(delay, 0)
+
+    def can_retry(
+        self, attempts: int, delay: float, policy: Optional[RetryPolicy] = None
+    ) -> bool:
+        """Whether another attempt is allowed after waiting delay seconds."""
+        policy = policy or self.policy
+        if attempts >= policy.max_attempts:
+            return False
+        remaining = self.remaining()
+        return remaining is None or remaining > delay
+
+    def timeout(self, timeout: float) -> float:
+        """Limit a timeout so that it doesn't run past the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise RetryDeadlineExceeded("Retry deadline exceeded")
+        return min(timeout, remaining)
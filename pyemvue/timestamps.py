@@ -0,0 +1,25 @@
+import datetime
+from functools import lru_cache
+
+from dateutil.parser import parse
+
+
+@lru_cache(maxsize=256)
+def parse_timestamp(value: str) -> datetime.datetime:
+    """Parse a timestamp from the API. The ISO 8601 timestamps it returns are parsed with datetime.fromisoformat,
+    anything else falls back to dateutil. Recently seen strings are memoized since the same instants and
+    offline times come back in every batch and every refresh."""
+    iso = value[:-1] + "+00:00" if value.endswith(("Z", "z")) else value
+    try:
+        return datetime.datetime.fromisoformat(iso)
+    except ValueError:
+        # before python 3.11 fromisoformat only accepts 3 or 6 fractional digits and no basic format
+        return parse(value)
+
+
+def format_timestamp(time: datetime.datetime) -> str:
+    """Format the time as the UTC ISO 8601 timestamp the API expects. Naive times are assumed to be UTC already."""
+    offset = time.utcoffset()
+    if offset:
+        time = time - offset
+    return time.replace(tzinfo=None).isoformat() + "Z"
@@ -0,0 +1,82 @@
+import contextlib
+import json
+import os
+import tempfile
+from typing import Any, Iterator, Optional
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class TokenStore(object):
+    """Persists the auth tokens so they can be shared between runs, and between processes when lock() is implemented."""
+
+    def load(self) -> Optional["dict[str, Any]"]:
+        """Return the stored tokens, or None if nothing is stored."""
+        raise NotImplementedError()
+
+    def save(self, tokens: "dict[str, Any]"):
+        """Store the tokens, replacing anything stored previously."""
+        raise NotImplementedError()
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold exclusive access to the store so that only one process refreshes the tokens at a time."""
+        yield
+
+
+class FileTokenStore(TokenStore):
+    """Stores the tokens as json in a file. A lock file next to it serializes token refreshes across processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + ".lock"
+
+    def load(self) -> Optional["dict[str, Any]"]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, tokens: "dict[str, Any]"):
+        _write_json_atomic(self.path, tokens, indent=2)
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        with open(self.lock_path, "a+") as f:
+            if os.name == "nt":
+                # msvcrt locks a byte range and keeps retrying for about 10 seconds
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_json_atomic(path: str, data: Any, indent: Optional[int] = None):
+    """Write json to a temporary file and move it into place so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,65 @@
+import datetime
+from typing import NamedTuple, Optional
+
+from pyemvue.device import VueUsageDevice
+from pyemvue.poller import UsageSample, iter_channel_usage
+
+
+class UsageDelta(NamedTuple):
+    """The channels to record for a snapshot. A keyframe has every channel, otherwise only the ones that changed."""
+
+    timestamp: datetime.datetime
+    keyframe: bool
+    samples: "list[UsageSample]"
+
+
+class UsageDiffer(object):
+    """Compares consecutive usage snapshots, such as the results of get_device_list_usage, and keeps only the channels that changed.
+    A channel changed when its usage moved by more than absolute_threshold and by more than relative_threshold (a fraction)
+    of its last recorded usage. Channels that drift slowly are still recorded once they have moved far enough from the last recorded value.
+    Every keyframe_interval snapshots, and for the first one, all channels are recorded. A keyframe_interval of 0 disables the periodic keyframes.
+    """
+
+    def __init__(
+        self,
+        absolute_threshold: float = 0.0,
+        relative_threshold: float = 0.0,
+        keyframe_interval: int = 60,
+    ):
+        self.absolute_threshold = max(absolute_threshold, 0)
+        self.relative_threshold = max(relative_threshold, 0)
+        self.keyframe_interval = max(keyframe_interval, 0)
+        self._recorded: dict[tuple[int, str], Optional[float]] = {}
+        self._snapshots = 0
+
+    def reset(self):
+        """Forget the recorded usage so that the next snapshot is a keyframe."""
+        self._recorded.clear()
+        self._snapshots = 0
+
+    def diff(
+        self, devices: "dict[int, VueUsageDevice]", timestamp: datetime.datetime
+    ) -> UsageDelta:
+        """Compare the snapshot with the usage recorded so far, including nested devices."""
+        keyframe = self._snapshots == 0 or bool(
+            self.keyframe_interval and self._snapshots % self.keyframe_interval == 0
+        )
+        self._snapshots += 1
+        samples = []
+        for sample in iter_channel_usage(devices, timestamp):
+            key = (sample.device_gid, sample.channel_num)
+            if (
+                keyframe
+                or key not in self._recorded
+                or self._changed(self._recorded[key], sample.usage)
+            ):
+                self._recorded[key] = sample.usage
+                samples.append(sample)
+        return UsageDelta(timestamp, keyframe, samples)
+
+    def _changed(self, recorded: Optional[float], usage: Optional[float]) -> bool:
+        if recorded is None or usage is None:
+            return recorded is not usage
+        return abs(usage - recorded) > max(
+            self.absolute_threshold, self.relative_threshold * abs(recorded)
+        )
@@ -0,0 +1,167 @@
+import datetime
+import math
+from array import array
+from typing import Any, Optional
+
+from pyemvue.enums import Unit
+from pyemvue.pyemvue import SCALE_STEPS
+from pyemvue.timestamps import parse_timestamp
+
+# numpy makes the column operations vectorized, without it the columns are plain arrays
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class UsageFrame(object):
+    """The usage of every channel in a getDeviceListUsages response, nested devices included, as parallel columns.
+    Row i has device_gid[i], channel_code[i] (an index into channel_nums), parent[i] (the row of the channel the device
+    is nested under, or -1), usage[i] (NaN where the usage is missing) and percentage[i].
+    The columns are numpy arrays when numpy is installed and array.array otherwise."""
+
+    def __init__(
+        self,
+        instant: Optional[datetime.datetime],
+        scale: str,
+        unit: str,
+        device_gid: "list[int]",
+        channel_code: "list[int]",
+        parent: "list[int]",
+        usage: "list[float]",
+        percentage: "list[float]",
+        channel_nums: "list[str]",
+        names: "list[str]",
+    ):
+        self.instant = instant
+        self.scale = scale
+        self.unit = unit
+        self.channel_nums = channel_nums
+        self.names = names
+        self.device_gid = _column(device_gid, "q")
+        self.channel_code = _column(channel_code, "l")
+        self.parent = _column(parent, "l")
+        self.usage = _column(usage, "d")
+        self.percentage = _column(percentage, "d")
+        self._rows = {
+            (gid, channel_nums[code]): row
+            for row, (gid, code) in enumerate(zip(device_gid, channel_code))
+        }
+
+    @classmethod
+    def from_json(cls, j: "dict[str, Any]") -> "UsageFrame":
+        """Build the frame straight from a decoded getDeviceListUsages response."""
+        usages = (j or {}).get("deviceListUsages") or {}
+        instant = parse_timestamp(usages["instant"]) if usages.get("instant") else None
+        device_gid: list[int] = []
+        channel_code: list[int] = []
+        parent: list[int] = []
+        usage: list[float] = []
+        percentage: list[float] = []
+        names: list[str] = []
+        channel_nums: list[str] = []
+        codes: dict[str, int] = {}
+
+        pending = [(device, -1) for device in usages.get("devices") or []]
+        pending.reverse()
+        while pending:
+            device, parent_row = pending.pop()
+            if not device:
+                continue
+            nested = []
+            for channel in device.get("channelUsages") or []:
+                if not channel:
+                    continue
+                channel_num = channel.get("channelNum", "1,2,3")
+                code = codes.get(channel_num)
+                if code is None:
+                    code = codes[channel_num] = len(channel_nums)
+                    channel_nums.append(channel_num)
+                row = len(device_gid)
+                device_gid.append(channel.get("deviceGid", device.get("deviceGid", 0)))
+                channel_code.append(code)
+                parent.append(parent_row)
+                value = channel.get("usage")
+                usage.append(math.nan if value is None else value)
+                percentage.append(channel.get("percentage") or 0.0)
+                names.append(channel.get("name") or "")
+                for nested_device in channel.get("nestedDevices") or []:
+                    nested.append((nested_device, row))
+            # depth first, keeping the order of the response
+            pending.extend(reversed(nested))
+
+        return cls(
+            instant,
+            usages.get("scale", ""),
+            usages.get("energyUnit", ""),
+            device_gid,
+            channel_code,
+            parent,
+            usage,
+            percentage,
+            channel_nums,
+            names,
+        )
+
+    def __len__(self) -> int:
+        return len(self.device_gid)
+
+    def row(self, device_gid: int, channel_num: str) -> Optional[int]:
+        """The row of the channel, or None if it isn't in the frame."""
+        return self._rows.get((device_gid, channel_num))
+
+    def get(self, device_gid: int, channel_num: str) -> Optional[float]:
+        """The usage of the channel, or None if it isn't in the frame or its usage is missing."""
+        row = self._rows.get((device_gid, channel_num))
+        if row is None:
+            return None
+        value = float(self.usage[row])
+        return None if math.isnan(value) else value
+
+    def scaled(self, factor: float) -> Any:
+        """The usage column multiplied by factor."""
+        if numpy is not None:
+            return self.usage * factor
+        return array("d", (value * factor for value in self.usage))
+
+    def watts(self) -> Any:
+        """The usage column as the average power in watts over the scale, for frames in KilowattHours."""
+        if self.unit != Unit.KWH.value:
+            raise ValueError(f"Can't convert {self.unit} to watts")
+        if self.scale not in SCALE_STEPS:
+            raise ValueError(f"The {self.scale} scale has no fixed length")
+        return self.scaled(3600000 / SCALE_STEPS[self.scale].total_seconds())
+
+    def total(self, top_level_only: bool = True) -> float:
+        """The sum of the usage, by default of the channels that aren't nested under another channel, skipping missing usage."""
+        if numpy is not None:
+            values = self.usage[self.parent < 0] if top_level_only else self.usage
+            return float(numpy.nansum(values))
+        return math.fsum(
+            value
+            for value, parent_row in zip(self.usage, self.parent)
+            if not math.isnan(value) and (parent_row < 0 or not top_level_only)
+        )
+
+    def sum_by_parent(self, values: Any = None) -> Any:
+        """For every row, the sum of values (the usage by default) over the rows nested directly under it. Missing values count as 0."""
+        if values is None:
+            values = self.usage
+        if numpy is not None:
+            values = numpy.asarray(values, dtype=numpy.float64)
+            nested = (self.parent >= 0) & ~numpy.isnan(values)
+            return numpy.bincount(
+                self.parent[nested], weights=values[nested], minlength=len(self)
+            )
+        sums = array("d", [0.0]) * len(self)
+        for value, parent_row in zip(values, self.parent):
+            if parent_row >= 0 and not math.isnan(value):
+                sums[parent_row] += value
+        return sums
+
+
+def _column(values: "list[Any]", typecode: str) -> Any:
+    if numpy is not None:
+        dtype = numpy.float64 if typecode == "d" else numpy.int64
+        return numpy.array(values, dtype=dtype)
+    return array(typecode, values)
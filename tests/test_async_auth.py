@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from pyemvue.async_auth import AsyncAuth  # noqa: E402
+
+
+def test_sync_with_is_rejected():
+    auth = AsyncAuth("https://example.invalid")
+    with pytest.raises(TypeError, match="async with"):
+        with auth:
+            pass
+    asyncio.run(auth.close())
+
+
+def test_async_with_closes_the_session():
+    async def use():
+        async with AsyncAuth("https://example.invalid") as auth:
+            auth._get_client_session()
+        return auth
+
+    assert asyncio.run(use())._client_session is None
@@ -0,0 +1,103 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from pyemvue.auth import Auth
+from pyemvue.token_store import FileTokenStore
+
+
+class FakeAuth(Auth):
+    """Hands out tokens that expire lifetime seconds after each refresh instead of calling Cognito."""
+
+    def __init__(self, lifetime, **kwargs):
+        super().__init__("https://example.invalid", background_refresh=True, **kwargs)
+        self.lifetime = lifetime
+        self.refreshes = 0
+        self.expiries = {"token-0": time.time() + lifetime}
+        self.cognito = SimpleNamespace(
+            access_token="token-0",
+            id_token="id",
+            refresh_token="refresh",
+            token_type="Bearer",
+        )
+        self.tokens = self._extract_tokens_from_cognito()
+
+    def _decode_token(self, token, verify_exp=False):
+        return {"exp": self.expiries[token]}
+
+    def refresh_tokens(self):
+        with self._refresh_lock:
+            self.refreshes += 1
+            token = f"token-{self.refreshes}"
+            self.expiries[token] = time.time() + self.lifetime
+            self.cognito.access_token = token
+            self.tokens = self._extract_tokens_from_cognito()
+            self._schedule_background_refresh()
+            return self.tokens
+
+
+def test_margin_longer_than_the_token_lifetime_does_not_refresh_in_a_loop():
+    auth = FakeAuth(lifetime=3600, refresh_margin=3600)
+    try:
+        auth._schedule_background_refresh()
+        assert auth._refresh_timer.interval >= 1799
+        time.sleep(0.2)
+        assert auth.refreshes == 0
+    finally:
+        auth.close()
+
+
+def test_refresh_is_scheduled_margin_before_expiry():
+    auth = FakeAuth(lifetime=3600, refresh_margin=300)
+    try:
+        auth._schedule_background_refresh()
+        assert 3299 <= auth._refresh_timer.interval <= 3300
+    finally:
+        auth.close()
+
+
+def test_background_refresh_uses_tokens_a_sibling_stored(tmp_path):
+    store = FileTokenStore(str(tmp_path / "keys.json"))
+    auth = FakeAuth(lifetime=3600, token_store=store)
+    try:
+        auth.expiries["sibling"] = time.time() + 3600
+        store.save(
+            {"access_token": "sibling", "id_token": "id", "refresh_token": "refresh"}
+        )
+        auth._background_refresh()
+        assert auth.refreshes == 0
+        assert auth.tokens["access_token"] == "sibling"
+
+        # nothing newer in the store, so this one refreshes
+        auth._background_refresh()
+        assert auth.refreshes == 1
+    finally:
+        auth.close()
+
+
+def test_concurrent_stale_callers_share_one_refresh():
+    auth = FakeAuth(lifetime=3600)
+    refresh_tokens = auth.refresh_tokens
+
+    def slow_refresh():
+        time.sleep(0.05)
+        return refresh_tokens()
+
+    auth.refresh_tokens = slow_refresh
+    start = threading.Barrier(8)
+    results = []
+
+    def call():
+        start.wait()
+        results.append(auth._refresh_tokens_if_stale("token-0")["access_token"])
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert auth.refreshes == 1
+        assert results == ["token-1"] * 8
+    finally:
+        auth.close()
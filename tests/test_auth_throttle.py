@@ -0,0 +1,56 @@
+import time
+
+from pyemvue.auth import Auth
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeRateLimiter(object):
+    def __init__(self):
+        self.throttled_for: list[float] = []
+
+    def throttled(self, path, retry_after=None):
+        self.throttled_for.append(retry_after)
+
+    def succeeded(self, path):
+        pass
+
+
+class FakeAuth(Auth):
+    """Answers with the queued responses instead of making requests."""
+
+    def __init__(self, responses, **kwargs):
+        super().__init__("https://example.invalid", **kwargs)
+        self.tokens = {"access_token": "token"}
+        self.responses = list(responses)
+        self.requests = 0
+
+    def _get_access_token_expiry(self) -> float:
+        return time.time() + 3600
+
+    def _do_request(self, method, path, retry_state=None, **kwargs):
+        self.requests += 1
+        return self.responses.pop(0)
+
+
+def test_retry_after_beyond_max_delay_returns_the_429():
+    limiter = FakeRateLimiter()
+    auth = FakeAuth(
+        [FakeResponse(429, {"Retry-After": "120"}), FakeResponse(200)],
+        max_retry_delay=30,
+        rate_limiter=limiter,
+    )
+    assert auth.request("get", "customers/devices").status_code == 429
+    assert auth.requests == 1
+    # the rate limiter holds off for as long as the server asked
+    assert limiter.throttled_for == [120]
+
+
+def test_retry_after_within_max_delay_is_retried():
+    auth = FakeAuth([FakeResponse(429, {"Retry-After": "0"}), FakeResponse(200)])
+    assert auth.request("get", "customers/devices").status_code == 200
+    assert auth.requests == 2
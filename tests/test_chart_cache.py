@@ -0,0 +1,17 @@
+import time
+
+from pyemvue.chart_cache import ChartUsageCache, missing_ranges
+
+
+def test_settled_gaps_are_cached_and_open_buckets_are_not(tmp_path):
+    cache = ChartUsageCache(str(tmp_path / "chart.db"), settle_time=300)
+    now = int(time.time()) // 60 * 60
+    old = now - 3600
+    points = {old: None, old + 60: 0.5, now: None}
+    cache.put(1, "1,2,3", "1MIN", "KilowattHours", 60, points)
+
+    cached = cache.get(1, "1,2,3", "1MIN", "KilowattHours", old, now)
+    assert cached == {old: None, old + 60: 0.5}
+    # only the bucket that is still open is fetched again
+    assert missing_ranges(cached, old, now, 60) == [(old + 120, now)]
+
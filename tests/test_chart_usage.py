@@ -0,0 +1,152 @@
+import datetime
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from pyemvue.chart_cache import ChartUsageCache
+from pyemvue.device import VueDeviceChannel
+from pyemvue.pyemvue import PyEmVue
+
+UTC = datetime.timezone.utc
+STEP = 60
+
+
+class FakeResponse(object):
+    def __init__(self, payload):
+        self.status_code = 200
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeChartAuth(object):
+    """Answers getChartUsage at the 1MIN scale with the bucket number, in epoch minutes, as the usage of every bucket.
+    With inclusive_end the bucket containing end is returned too, otherwise only buckets starting before end.
+    Requests whose start falls in empty_from..empty_to get an empty usageList."""
+
+    circuit_breaker = None
+
+    def __init__(self, inclusive_end, empty_from=None, empty_to=None):
+        self.inclusive_end = inclusive_end
+        self.empty_from = empty_from
+        self.empty_to = empty_to
+        self.requests: list[tuple[int, int]] = []
+
+    def request(self, method, path, **kwargs):
+        query = parse_qs(urlparse(path).query)
+        start = _epoch(query["start"][0])
+        end = _epoch(query["end"][0])
+        self.requests.append((start, end))
+        first = start // STEP * STEP
+        if self.inclusive_end:
+            last = end // STEP * STEP
+        else:
+            last = -(-end // STEP) * STEP - STEP
+        if self.empty_from is not None and self.empty_from <= start <= self.empty_to:
+            return FakeResponse({"usageList": []})
+        return FakeResponse(
+            {
+                "firstUsageInstant": _iso(first),
+                "usageList": [bucket / STEP for bucket in range(first, last + 1, STEP)],
+            }
+        )
+
+
+def _epoch(value):
+    return int(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def _iso(epoch):
+    return datetime.datetime.fromtimestamp(epoch, UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def get_chart_usage(auth, start, end, cache=None):
+    vue = PyEmVue(chart_usage_cache=cache)
+    vue.auth = auth
+    channel = VueDeviceChannel(gid=1, channelNum="1,2,3")
+    return vue.get_chart_usage(channel, start, end, scale="1MIN")
+
+
+def check_series(usage, instant, start, end):
+    """Every point is at its own bucket, once, from the bucket of start up to the last bucket starting before end."""
+    first = int(start.timestamp()) // STEP
+    assert int(instant.timestamp()) == first * STEP
+    values = [value for value in usage if value is not None]
+    assert usage[: len(values)] == values, "gaps in the series"
+    assert values == [float(first + i) for i in range(len(values))]
+    last_before_end = -(-int(end.timestamp()) // STEP) - 1
+    assert first + len(values) - 1 >= last_before_end
+
+
+START = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+# five days at 1MIN is fetched in three two day chunks
+END = START + datetime.timedelta(days=5)
+
+
+@pytest.mark.parametrize("inclusive_end", [True, False])
+@pytest.mark.parametrize("offset", [0, 30])
+def test_chunks_are_stitched_without_duplicates_or_gaps(inclusive_end, offset):
+    start = START + datetime.timedelta(seconds=offset)
+    end = END + datetime.timedelta(seconds=offset)
+    auth = FakeChartAuth(inclusive_end)
+    usage, instant = get_chart_usage(auth, start, end)
+    assert len(auth.requests) == 3
+    check_series(usage, instant, start, end)
+
+
+@pytest.mark.parametrize("offset", [0, 30])
+def test_an_empty_chunk_leaves_a_gap_of_none(offset):
+    start = START + datetime.timedelta(seconds=offset)
+    end = END + datetime.timedelta(seconds=offset)
+    empty_start = int(start.timestamp()) + 2 * 86400
+    auth = FakeChartAuth(True, empty_start, empty_start)
+    usage, instant = get_chart_usage(auth, start, end)
+
+    first = int(start.timestamp()) // STEP
+    assert int(instant.timestamp()) == first * STEP
+    for i, value in enumerate(usage):
+        bucket = (first + i) * STEP
+        if empty_start < bucket < empty_start + 2 * 86400 - STEP:
+            assert value is None
+        elif value is not None:
+            assert value == first + i
+    assert usage[-1] is not None
+
+
+@pytest.mark.parametrize("offset", [0, 30])
+def test_an_empty_first_chunk_keeps_the_later_points_in_place(offset):
+    start = START + datetime.timedelta(seconds=offset)
+    end = END + datetime.timedelta(seconds=offset)
+    first_start = int(start.timestamp())
+    auth = FakeChartAuth(True, first_start, first_start)
+    usage, instant = get_chart_usage(auth, start, end)
+    offset_steps = round((instant.timestamp() - first_start // STEP * STEP) / STEP)
+    assert int(instant.timestamp()) % STEP == 0
+    for i, value in enumerate(usage):
+        if value is not None:
+            assert value == first_start // STEP + offset_steps + i
+
+
+@pytest.mark.parametrize("inclusive_end", [True, False])
+@pytest.mark.parametrize("offset", [0, 30])
+def test_cached_series_matches_and_is_served_locally(inclusive_end, offset):
+    start = START + datetime.timedelta(seconds=offset)
+    end = END + datetime.timedelta(seconds=offset)
+    cache = ChartUsageCache(":memory:")
+    auth = FakeChartAuth(inclusive_end)
+    usage, instant = get_chart_usage(auth, start, end, cache)
+    check_series(usage, instant, start, end)
+    # the cache covers exactly the buckets starting before end
+    assert len(usage) == -(-int(end.timestamp()) // STEP) - int(start.timestamp()) // STEP
+
+    requests = len(auth.requests)
+    assert get_chart_usage(auth, start, end, cache) == (usage, instant)
+    assert len(auth.requests) == requests
+
+    # a longer range only fetches the new part
+    later = end + datetime.timedelta(hours=1)
+    usage, instant = get_chart_usage(auth, start, later, cache)
+    check_series(usage, instant, start, later)
+    assert len(auth.requests) == requests + 1
@@ -0,0 +1,38 @@
+import threading
+import time
+
+import pytest
+
+from pyemvue.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def test_maintenance_check_does_not_block_other_callers():
+    checking = threading.Event()
+    release = threading.Event()
+
+    def slow_checker():
+        checking.set()
+        release.wait(5)
+        return "scheduled maintenance"
+
+    breaker = CircuitBreaker(failure_threshold=1, maintenance_checker=slow_checker)
+    breaker.record_failure()
+
+    def first_caller():
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+    thread = threading.Thread(target=first_caller)
+    thread.start()
+    assert checking.wait(5)
+
+    # while the check runs other callers still fail fast and can record results
+    started = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert time.monotonic() - started < 1
+
+    release.set()
+    thread.join(5)
+    assert breaker.maintenance_message == "scheduled maintenance"
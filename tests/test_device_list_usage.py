@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from pyemvue.pyemvue import (
+    DEVICE_LIST_USAGE_MAX_URL_LENGTH,
+    PyEmVue,
+    _batch_device_gids,
+    _device_list_usage_url,
+)
+
+
+class FakeResponse(object):
+    def __init__(self, payload):
+        self.status_code = 200
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeAuth(object):
+    """Answers getDeviceListUsages with no usage for any channel, leaving out the gids in absent."""
+
+    circuit_breaker = None
+
+    def __init__(self, absent=()):
+        self.absent = set(absent)
+        self.requested: list[list[str]] = []
+
+    def request(self, method, path, **kwargs):
+        # parse_qs decodes the + separators to spaces
+        gids = parse_qs(urlparse(path).query)["deviceGids"][0].split()
+        self.requested.append(gids)
+        devices = [
+            {
+                "deviceGid": int(gid),
+                "channelUsages": [
+                    {"deviceGid": int(gid), "channelNum": "1", "usage": None}
+                ],
+            }
+            for gid in gids
+            if gid not in self.absent
+        ]
+        return FakeResponse(
+            {
+                "deviceListUsages": {
+                    "instant": "2024-01-01T00:00:00Z",
+                    "scale": "1S",
+                    "energyUnit": "KilowattHours",
+                    "devices": devices,
+                }
+            }
+        )
+
+
+def get_usage(auth, gids, max_batch_size):
+    vue = PyEmVue()
+    vue.auth = auth
+    return vue.get_device_list_usage(
+        gids,
+        datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        max_retry_attempts=1,
+        max_batch_size=max_batch_size,
+    )
+
+
+def test_missing_channels_of_every_batch_are_reported_once():
+    usage = get_usage(FakeAuth(), [1, 2, 3, 4], max_batch_size=2)
+    assert sorted(usage.missing_channels) == [(1, "1"), (2, "1"), (3, "1"), (4, "1")]
+    assert usage.missing_devices == []
+
+
+def test_devices_left_out_of_the_response_are_reported():
+    auth = FakeAuth(absent={"2", "4"})
+    usage = get_usage(auth, [1, 2, 3, 4], max_batch_size=2)
+    assert sorted(usage) == [1, 3]
+    assert sorted(usage.missing_devices) == [2, 4]
+    assert sorted(usage.missing_channels) == [(1, "1"), (3, "1")]
+    assert sorted(auth.requested) == [["1", "2"], ["3", "4"]]
+
+
+def test_async_client_shares_the_bookkeeping():
+    pytest.importorskip("aiohttp")
+    from pyemvue.async_pyemvue import AsyncPyEmVue
+
+    class AsyncFakeAuth(FakeAuth):
+        async def request(self, method, path, **kwargs):
+            return FakeAuth.request(self, method, path, **kwargs)
+
+    vue = AsyncPyEmVue()
+    vue.auth = AsyncFakeAuth(absent={"4"})
+    usage = asyncio.run(
+        vue.get_device_list_usage(
+            [1, 2, 3, 4],
+            datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+            max_retry_attempts=1,
+            max_batch_size=2,
+        )
+    )
+    assert sorted(usage.missing_channels) == [(1, "1"), (2, "1"), (3, "1")]
+    assert usage.missing_devices == [4]
+
+
+INSTANT = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize("max_batch_size", [None, 1, 7, 500])
+def test_batches_keep_every_gid_in_order_and_fit_the_url(max_batch_size):
+    gids = [str(10**9 + i) for i in range(1000)]
+    batches = _batch_device_gids(gids, INSTANT, "1MIN", "KilowattHours", max_batch_size)
+    assert [gid for batch in batches for gid in batch] == gids
+    assert all(batches)
+    for batch in batches:
+        if max_batch_size:
+            assert len(batch) <= max_batch_size
+        url = _device_list_usage_url(batch, INSTANT, "1MIN", "KilowattHours")
+        assert len(url) <= DEVICE_LIST_USAGE_MAX_URL_LENGTH
+    # batches are only split when they have to be
+    if max_batch_size != 1:
+        url = _device_list_usage_url(
+            batches[0] + batches[1][:1], INSTANT, "1MIN", "KilowattHours"
+        )
+        assert (
+            len(url) > DEVICE_LIST_USAGE_MAX_URL_LENGTH
+            or len(batches[0]) == max_batch_size
+        )
+
+
+def test_batches_accept_plus_separated_gids():
+    assert _batch_device_gids("1+2+3", INSTANT, "1MIN", "KilowattHours", 2) == [
+        ["1", "2"],
+        ["3"],
+    ]
+    assert _batch_device_gids([1, 2, 3], INSTANT, "1MIN", "KilowattHours", None) == [
+        ["1", "2", "3"]
+    ]
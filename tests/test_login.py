@@ -0,0 +1,55 @@
+import json
+
+from pyemvue.pyemvue import PyEmVue, _prepare_login
+from pyemvue.token_store import FileTokenStore
+
+
+def test_credentials_come_from_the_token_file(tmp_path):
+    path = tmp_path / "keys.json"
+    path.write_text(
+        json.dumps(
+            {
+                "id_token": "id",
+                "access_token": "access",
+                "refresh_token": "refresh",
+                "username": "user@example.com",
+            }
+        )
+    )
+    vue = PyEmVue()
+    password, tokens, jwks_cache_file = _prepare_login(
+        vue, None, None, None, None, None, str(path), None
+    )
+    assert password is None
+    assert tokens == {
+        "access_token": "access",
+        "id_token": "id",
+        "refresh_token": "refresh",
+    }
+    assert vue.username == "user@example.com"
+    assert vue.token_store.path == str(path)
+    assert jwks_cache_file == str(tmp_path / "keys.jwks.json")
+
+
+def test_a_password_skips_the_token_file(tmp_path):
+    path = tmp_path / "keys.json"
+    path.write_text(json.dumps({"access_token": "stale"}))
+    vue = PyEmVue(jwks_cache_file="jwks.json")
+    password, tokens, jwks_cache_file = _prepare_login(
+        vue, "User@Example.com", "secret", None, None, None, str(path), None
+    )
+    assert password == "secret"
+    assert tokens["access_token"] is None
+    assert vue.username == "user@example.com"
+    assert jwks_cache_file == "jwks.json"
+
+
+def test_a_missing_token_file_is_an_empty_store(tmp_path):
+    path = tmp_path / "keys.json"
+    assert FileTokenStore(str(path)).load() is None
+    vue = PyEmVue()
+    password, tokens, _ = _prepare_login(
+        vue, None, None, None, None, None, str(path), None
+    )
+    assert password is None
+    assert tokens == {"access_token": None, "id_token": None, "refresh_token": None}
@@ -0,0 +1,26 @@
+# Compares decoding large synthetic usage payloads with the standard json module
+# against the backend picked by pyemvue.json_decoder, and shows the gzip savings.
+# Install orjson or msgspec to see the fast path.
+# Run it from the repository root with PYTHONPATH=. so that pyemvue is importable.
+import gzip
+import json
+import random
+import timeit
+
+from pyemvue.json_decoder import BACKEND, loads
+
+from payloads import device_list_usages
+
+
+def chart_usage(points=86400):
+    return {'firstUsageInstant': '2024-01-01T00:00:00Z', 'usageList': [random.random() / 1000 for _ in range(points)]}
+
+
+for name, payload in [('getDeviceListUsages', device_list_usages(50, 19, 4)), ('getChartUsage 1S/day', chart_usage())]:
+    raw = json.dumps(payload).encode()
+    compressed = gzip.compress(raw)
+    number = 20
+    stdlib = timeit.timeit(lambda: json.loads(raw.decode('utf-8')), number=number) / number
+    fast = timeit.timeit(lambda: loads(raw), number=number) / number
+    print(f'{name}: {len(raw) / 1024:.0f} KiB raw, {len(compressed) / 1024:.0f} KiB gzipped')
+    print(f'\tjson: {stdlib * 1000:.2f} ms, {BACKEND}: {fast * 1000:.2f} ms ({stdlib / fast:.1f}x)')
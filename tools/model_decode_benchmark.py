@@ -0,0 +1,112 @@
+# Times decoding large synthetic customers/devices and getDeviceListUsages responses from bytes into the models,
+# with the standard json module and with the backend picked by pyemvue.json_decoder (install orjson or msgspec to see the fast path).
+# Also compares decoding the nested devices eagerly and on demand (lazy_nested), and the hand-written if chains
+# of the models against decoding through a field map, compiled or looped over.
+# Run it from the repository root with PYTHONPATH=. so that pyemvue is importable.
+import json
+import timeit
+
+from pyemvue.device import VueDeviceChannel
+from pyemvue.json_decoder import BACKEND, loads
+from pyemvue.pyemvue import _parse_device_list_usage, _parse_devices
+
+from payloads import device_list_usages
+
+
+def customer_devices(devices=200, channels=19):
+    return {
+        'devices': [
+            {
+                'deviceGid': 1000 + d,
+                'manufacturerDeviceId': f'A{d:06}',
+                'model': 'VUE002',
+                'firmware': 'Vue2-1.0',
+                'locationProperties': {
+                    'deviceName': f'Home {d}', 'displayName': f'Home {d}', 'zipCode': '12345', 'timeZone': 'America/New_York',
+                    'usageCentPerKwHour': 15.0, 'peakDemandDollarPerKw': 0.0, 'billingCycleStartDay': 1, 'solar': False,
+                    'locationInformation': {'airConditioning': 'true', 'heatSource': 'electric', 'locationSqFt': '2000', 'numElectricCars': '1', 'locationType': 'houseMultiLevel', 'numPeople': '4', 'swimmingPool': 'false', 'hotTub': 'false'},
+                    'latitudeLongitude': {'latitude': 40.0, 'longitude': -75.0},
+                },
+                'channels': [
+                    {'deviceGid': 1000 + d, 'name': f'Channel {c}', 'channelNum': str(c), 'channelMultiplier': 1.0, 'channelTypeGid': 1, 'type': 'FiftyAmp', 'parentChannelNum': None}
+                    for c in range(channels)
+                ],
+                'deviceConnected': {'connected': True, 'offlineSince': None},
+                'devices': [],
+            }
+            for d in range(devices)
+        ]
+    }
+
+
+def timed(func, number=10):
+    return timeit.timeit(func, number=number) / number * 1000
+
+
+for name, payload, parse in [
+    ('customers/devices', customer_devices(), _parse_devices),
+    ('getDeviceListUsages', device_list_usages(200, 19, 2), _parse_device_list_usage),
+]:
+    raw = json.dumps(payload).encode()
+    stdlib = timed(lambda: parse(json.loads(raw.decode('utf-8'))))
+    fast = timed(lambda: parse(loads(raw)))
+    print(f'{name}: {len(raw) / 1024:.0f} KiB')
+    print(f'\tjson + models: {stdlib:.2f} ms, {BACKEND} + models: {fast:.2f} ms ({stdlib / fast:.1f}x)')
+
+usages = loads(json.dumps(device_list_usages(200, 19, 2)).encode())
+eager = timed(lambda: _parse_device_list_usage(usages))
+lazy = timed(lambda: _parse_device_list_usage(usages, lazy_nested=True))
+print('getDeviceListUsages nested devices')
+print(f'\tdecoded eagerly: {eager:.2f} ms, on demand: {lazy:.2f} ms ({eager / lazy:.1f}x)')
+
+
+# The alternatives to the hand-written if chains that were tried for VueDeviceChannel. Neither was faster,
+# so the models keep their if chains. This keeps the comparison around for anyone trying again.
+channel_fields = {
+    'deviceGid': 'device_gid', 'name': 'name', 'channelNum': 'channel_num', 'channelMultiplier': 'channel_multiplier',
+    'channelTypeGid': 'channel_type_gid', 'type': 'type', 'parentChannelNum': 'parent_channel_num',
+}
+
+
+def compile_field_map(fields):
+    """Generate the same if chain as the models from the field map."""
+    lines = ['def from_json_dictionary(self, js):']
+    for key, attribute in fields.items():
+        lines.append(f'    if {key!r} in js:')
+        lines.append(f'        self.{attribute} = js[{key!r}]')
+    lines.append('    return self')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['from_json_dictionary']
+
+
+class CompiledFieldMapChannel(VueDeviceChannel):
+    from_json_dictionary = compile_field_map(channel_fields)
+
+
+class LoopedFieldMapChannel(VueDeviceChannel):
+    def from_json_dictionary(self, js):
+        for key, attribute in channel_fields.items():
+            if key in js:
+                setattr(self, attribute, js[key])
+        return self
+
+
+channel = {'deviceGid': 1000, 'name': 'Channel 1', 'channelNum': '1', 'channelMultiplier': 1.0, 'channelTypeGid': 1, 'type': 'FiftyAmp', 'parentChannelNum': None}
+number = 20000
+
+
+def per_object(classes, js, repeat=15):
+    # best of interleaved runs, the differences are small enough to be lost in the noise otherwise
+    best = [float('inf')] * len(classes)
+    for _ in range(repeat):
+        for i, cls in enumerate(classes):
+            best[i] = min(best[i], timeit.timeit(lambda: cls().from_json_dictionary(js), number=number))
+    return [t / number * 1e9 for t in best]
+
+
+hand_written, compiled, looped = per_object([VueDeviceChannel, CompiledFieldMapChannel, LoopedFieldMapChannel], channel)
+print('Creating and decoding a VueDeviceChannel')
+print(f'\tif chain: {hand_written:.0f} ns')
+print(f'\tcompiled field map: {compiled:.0f} ns ({(compiled - hand_written) / hand_written * 100:+.0f}%)')
+print(f'\tfield map looped over at runtime: {looped:.0f} ns ({(looped - hand_written) / hand_written * 100:+.0f}%)')
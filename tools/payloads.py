@@ -0,0 +1,30 @@
+# Synthetic API responses shared by the benchmarks in this directory.
+import random
+
+
+def channel_usage(gid, num, nested):
+    return {
+        'name': f'Channel {num}',
+        'deviceGid': gid,
+        'channelNum': str(num),
+        'usage': random.random() / 1000,
+        'percentage': random.random() * 100,
+        'nestedDevices': nested,
+    }
+
+
+def device_list_usages(devices, channels, plugs):
+    """A getDeviceListUsages response for devices monitors of channels channels each, with plugs nested
+    under each of the first three channels."""
+    devs = []
+    for d in range(devices):
+        gid = 1000 + d
+        chans = []
+        for c in range(channels):
+            nested = [
+                {'deviceGid': gid * 100 + c * 10 + p, 'channelUsages': [channel_usage(gid * 100 + c * 10 + p, '1,2,3', [])]}
+                for p in range(plugs if c < 3 else 0)
+            ]
+            chans.append(channel_usage(gid, c, nested))
+        devs.append({'deviceGid': gid, 'channelUsages': chans})
+    return {'deviceListUsages': {'instant': '2024-01-01T00:00:00Z', 'scale': '1S', 'energyUnit': 'KilowattHours', 'devices': devs}}
@@ -0,0 +1,46 @@
+# Measures the memory held by a buffer of parsed getDeviceListUsages snapshots, comparing the lean usage
+# models with the layout they had when every usage object also carried all of the VueDevice/VueDeviceChannel attributes.
+# Run it from the repository root with PYTHONPATH=. so that pyemvue is importable.
+import tracemalloc
+
+from pyemvue.device import VueDevice, VueDeviceChannel
+from pyemvue.pyemvue import _parse_device_list_usage
+
+from payloads import device_list_usages
+
+
+def with_inherited_attributes(devices):
+    """Give the objects every attribute the base classes set, as the usage models used to have."""
+    for device in devices:
+        gid, timestamp, channels = device.device_gid, device.timestamp, device.channels
+        VueDevice.__init__(device, gid)
+        device.device_gid, device.timestamp, device.channels = gid, timestamp, channels
+        for channel in channels.values():
+            nested = channel.nested_devices
+            VueDeviceChannel.__init__(channel, channel.device_gid, channel.name, channel.channel_num)
+            channel.nested_devices = nested
+            with_inherited_attributes(nested.values())
+
+
+def measure(snapshots, expand):
+    payloads = [device_list_usages(10, 19, 1) for _ in range(snapshots)]
+    tracemalloc.start()
+    buffer = []
+    for payload in payloads:
+        devices = _parse_device_list_usage(payload)
+        if expand:
+            with_inherited_attributes(devices)
+        buffer.append(devices)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+snapshots = 300
+channels = sum(1 + (c < 3) for c in range(19)) * 10
+print(f'{snapshots} snapshots of {channels} channels')
+lean = measure(snapshots, expand=False)
+full = measure(snapshots, expand=True)
+print(f'\tlean models: {lean / 1024 / 1024:.1f} MiB ({lean / snapshots / channels:.0f} bytes per channel)')
+print(f'\twith inherited attributes: {full / 1024 / 1024:.1f} MiB ({full / snapshots / channels:.0f} bytes per channel)')
+print(f'\t{full / lean:.1f}x smaller')